@@ -0,0 +1,73 @@
+"""Общие функции бенчмарков.
+
+Бенчмарки запускаются из каталога backend, например
+python -m benchmarks.feed, и работают на временной тестовой базе,
+которая создаётся и удаляется так же, как в manage.py test.
+"""
+import argparse
+import os
+import statistics
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+    django.setup()
+
+
+def parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=20,
+        help='Number of timed runs of every case.'
+    )
+    return parser
+
+
+@contextmanager
+def test_database():
+    from django.db import DEFAULT_DB_ALIAS
+    from django.test.utils import (
+        setup_databases,
+        setup_test_environment,
+        teardown_databases,
+        teardown_test_environment
+    )
+
+    setup_test_environment()
+    old_config = setup_databases(
+        verbosity=1,
+        interactive=False,
+        aliases={DEFAULT_DB_ALIAS}
+    )
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=1)
+        teardown_test_environment()
+
+
+def measure(func, repeat, timer=time.perf_counter, before=None):
+    """Медиана и минимум времени выполнения func в миллисекундах.
+
+    before вызывается перед каждым запуском и в замер не входит.
+    """
+    func()
+    timings = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = timer()
+        func()
+        timings.append((timer() - start) * 1000)
+    return statistics.median(timings), min(timings)
+
+
+def report(name, timings):
+    median, best = timings
+    print(f'{name:<40} median {median:8.2f} ms   min {best:8.2f} ms')
@@ -0,0 +1,44 @@
+"""Стоимость подключения к базе на один запрос.
+
+Цикл запроса повторяется сигналами request_started и request_finished,
+на которых Django открывает, проверяет и закрывает соединения, и одним
+запросом к таблице тегов между ними. Сравниваются новое соединение на
+каждый запрос (DB_CONN_MAX_AGE=0) и постоянное соединение с проверкой
+DB_CONN_HEALTH_CHECKS и без неё.
+"""
+from benchmarks.base import measure, parser, report, setup, test_database
+
+CASES = (
+    ('new connection per request', 0, False),
+    ('persistent, health checks', 60, True),
+    ('persistent, no health checks', 60, False),
+)
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.set_defaults(repeat=200)
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        from django.core.signals import request_finished, request_started
+        from django.db import connection
+
+        from recipes.models import Tags
+
+        Tags.objects.create(name='Завтрак', color='#E26C2D', slug='breakfast')
+
+        def request():
+            request_started.send(sender=None)
+            list(Tags.objects.all())
+            request_finished.send(sender=None)
+
+        for name, max_age, health_checks in CASES:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            connection.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+            report(name, measure(request, options.repeat))
+
+
+if __name__ == '__main__':
+    main()
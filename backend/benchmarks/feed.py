@@ -0,0 +1,179 @@
+"""Лента подписок пользователя с 10 000 подписок.
+
+Сравнивает прежний запрос, где id IN (лента) объединялся через OR с
+рецептами авторов, не разосланных по лентам, и запрос
+FeedsManager.recipe_ids, который читает ленту по индексу
+(user, recipe) и добавляет такие рецепты через UNION ALL по частичному
+индексу recipes_not_in_feeds_idx.
+"""
+from benchmarks.base import measure, parser, report, setup, test_database
+
+
+def populate(subscriptions, recipes_per_author, popular_share,
+             other_recipes, other_readers, other_followers):
+    """Читатель с подписками и остальной сайт.
+
+    Рецепты подписок публикуются вперемешку с рецептами других авторов,
+    которые разосланы по лентам other_followers других читателей.
+    Рецепты доли popular_share авторов подписок по лентам не разосланы.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from recipes.models import Feeds, Recipes
+    from users.models import Subscribe
+
+    User = get_user_model()
+
+    def create_users(prefix, count):
+        return User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}{number}',
+                    email=f'{prefix}{number}@example.com',
+                    first_name=prefix.title(),
+                    last_name=str(number)
+                )
+                for number in range(count)
+            ),
+            batch_size=5000
+        )
+
+    reader, = create_users('reader', 1)
+    authors = create_users('author', subscriptions)
+    others = create_users('other', max(other_readers, 1))
+    Subscribe.objects.bulk_create(
+        (Subscribe(user=reader, author=author) for author in authors),
+        batch_size=5000
+    )
+    popular = {
+        author.id
+        for author in authors[:int(subscriptions * popular_share)]
+    }
+    other_per_round = other_recipes // recipes_per_author
+
+    def recipe(author, in_feeds):
+        return Recipes(
+            author=author,
+            name='Рецепт',
+            text='Описание',
+            image='recipes/images/recipe.png',
+            cooking_time=10,
+            in_feeds=in_feeds
+        )
+
+    for _ in range(recipes_per_author):
+        recipes = Recipes.objects.bulk_create(
+            (
+                recipe(author, author.id not in popular)
+                for author in authors
+            ),
+            batch_size=5000
+        )
+        Feeds.objects.bulk_create(
+            (
+                Feeds(user=reader, recipe=item, author_id=item.author_id)
+                for item in recipes
+                if item.in_feeds
+            ),
+            batch_size=5000
+        )
+        recipes = Recipes.objects.bulk_create(
+            (
+                recipe(others[number % len(others)], True)
+                for number in range(other_per_round)
+            ),
+            batch_size=5000
+        )
+        Feeds.objects.bulk_create(
+            (
+                Feeds(
+                    user=others[(number + shift) % len(others)],
+                    recipe=item,
+                    author_id=item.author_id
+                )
+                for number, item in enumerate(recipes)
+                for shift in range(1, other_followers + 1)
+            ),
+            batch_size=5000,
+            ignore_conflicts=True
+        )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return reader
+
+
+def or_recipe_ids(user):
+    """Запрос ленты до перехода на UNION ALL."""
+    from django.db.models import Q
+
+    from recipes.models import Feeds, Recipes
+    from users.models import Subscribe
+
+    return Recipes.objects.filter(
+        Q(id__in=Feeds.objects.filter(user=user).values('recipe_id'))
+        | Q(
+            in_feeds=False,
+            author__in=Subscribe.objects.filter(
+                user=user
+            ).values('author_id')
+        )
+    ).order_by('-id').values_list('id', flat=True)
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.add_argument('--subscriptions', type=int, default=10000)
+    arguments.add_argument('--recipes-per-author', type=int, default=3)
+    arguments.add_argument(
+        '--popular-share',
+        type=float,
+        default=0.01,
+        help='Share of authors whose recipes are not fanned out.'
+    )
+    arguments.add_argument('--other-recipes', type=int, default=100000)
+    arguments.add_argument('--other-readers', type=int, default=1000)
+    arguments.add_argument('--other-followers', type=int, default=5)
+    arguments.add_argument('--page-size', type=int, default=6)
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        from recipes.models import Feeds
+
+        from recipes.models import Recipes
+
+        user = populate(
+            options.subscriptions,
+            options.recipes_per_author,
+            options.popular_share,
+            options.other_recipes,
+            options.other_readers,
+            options.other_followers
+        )
+        feed = list(or_recipe_ids(user))
+        print(
+            f'{options.subscriptions} subscriptions, {len(feed)} recipes '
+            f'in the feed, {Recipes.objects.count()} recipes and '
+            f'{Feeds.objects.count()} feed rows in total'
+        )
+        size = options.page_size + 1
+        middle = feed[len(feed) // 2]
+        cases = {
+            'OR, first page': lambda: list(or_recipe_ids(user)[:size]),
+            'UNION ALL, first page': lambda: list(
+                Feeds.objects.recipe_ids(user, size)
+            ),
+            'OR, page in the middle': lambda: list(
+                or_recipe_ids(user).filter(id__lt=middle)[:size]
+            ),
+            'UNION ALL, page in the middle': lambda: list(
+                Feeds.objects.recipe_ids(user, size, before=middle)
+            ),
+        }
+        assert cases['OR, first page']() == cases['UNION ALL, first page']()
+        for name, case in cases.items():
+            report(name, measure(case, options.repeat))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+"""Фильтры списка рецептов по тегам, избранному и корзине.
+
+Сравнивает прежние фильтры, которые соединяли рецепты с таблицей тегов,
+избранным и корзиной и убирали повторы через .distinct(), и фильтры
+RecipeFilter на Exists(). Для каждого набора фильтров замеряются
+COUNT(*) и первая страница, как их запрашивает пагинация списка.
+"""
+from benchmarks.base import measure, parser, report, setup, test_database
+
+
+def populate(recipes, favorites, cart_size):
+    """Рецепты с одним-тремя тегами, избранное и корзина читателя.
+
+    Избранное и корзина берутся из рецептов с несколькими тегами, на
+    которых соединение с таблицей тегов даёт повторы.
+    """
+    from django.contrib.auth import get_user_model
+    from django.db import connection
+
+    from recipes.models import Carts, Favorites, Recipes, Tags
+
+    User = get_user_model()
+    tags = [
+        Tags.objects.create(
+            name=f'Тег {number}',
+            color=f'#00000{number}',
+            slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+    author, reader = User.objects.bulk_create(
+        User(
+            username=username,
+            email=f'{username}@example.com',
+            first_name=username.title(),
+            last_name=username.title()
+        )
+        for username in ('author', 'reader')
+    )
+    created = Recipes.objects.bulk_create(
+        (
+            Recipes(
+                author=author,
+                name=f'Рецепт {number}',
+                text='Описание рецепта',
+                image='recipes/images/recipe.png',
+                cooking_time=10
+            )
+            for number in range(recipes)
+        ),
+        batch_size=5000
+    )
+    Recipes.tags.through.objects.bulk_create(
+        (
+            Recipes.tags.through(recipes_id=recipe.id, tags_id=tag.id)
+            for number, recipe in enumerate(created)
+            for tag in tags[:number % len(tags) + 1]
+        ),
+        batch_size=5000
+    )
+    step = recipes // (favorites + cart_size)
+    Favorites.objects.bulk_create(
+        (
+            Favorites(user=reader, recipe=recipe)
+            for recipe in created[2::step][:favorites]
+        ),
+        batch_size=5000
+    )
+    Carts.objects.bulk_create(
+        (
+            Carts(user=reader, recipe=recipe)
+            for recipe in created[2::step * 2][:cart_size]
+        ),
+        batch_size=5000
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+    return reader
+
+
+def join_recipes(user, slugs, favorited, in_cart):
+    """Фильтры до перехода на Exists()."""
+    from recipes.models import Recipes, Tags
+
+    queryset = Recipes.objects.order_by('-id')
+    if slugs:
+        queryset = queryset.filter(
+            tags__in=Tags.objects.filter(slug__in=slugs).values('id')
+        ).distinct()
+    if favorited:
+        queryset = queryset.filter(favorites__user=user)
+    if in_cart:
+        queryset = queryset.filter(carts__user=user)
+    return queryset
+
+
+def exists_recipes(user, slugs, favorited, in_cart):
+    from types import SimpleNamespace
+
+    from django.http import QueryDict
+
+    from food_api.filters import RecipeFilter
+    from recipes.models import Recipes
+
+    data = QueryDict(mutable=True)
+    data.setlist('tags', slugs)
+    if favorited:
+        data['is_favorited'] = 'true'
+    if in_cart:
+        data['is_in_shopping_cart'] = 'true'
+    return RecipeFilter(
+        data,
+        Recipes.objects.order_by('-id'),
+        request=SimpleNamespace(user=user)
+    ).qs
+
+
+CASES = (
+    ('one tag', ['tag2'], False, False),
+    ('three tags', ['tag0', 'tag1', 'tag2'], False, False),
+    ('three tags, favorites, cart', ['tag0', 'tag1', 'tag2'], True, True),
+)
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.add_argument('--recipes', type=int, default=100000)
+    arguments.add_argument('--favorites', type=int, default=2000)
+    arguments.add_argument('--cart-size', type=int, default=500)
+    arguments.add_argument('--page-size', type=int, default=6)
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        user = populate(options.recipes, options.favorites, options.cart_size)
+        for name, *filters in CASES:
+            join = join_recipes(user, *filters)
+            exists = exists_recipes(user, *filters)
+            assert list(join.values_list('id', flat=True)) == list(
+                exists.values_list('id', flat=True)
+            )
+            print(f'{name}: {exists.count()} recipes')
+            for method, queryset in (('JOIN + DISTINCT', join),
+                                     ('EXISTS', exists)):
+                report(
+                    f'  {method}, count',
+                    measure(queryset.count, options.repeat)
+                )
+                report(f'  {method}, first page', measure(
+                    lambda: list(queryset[:options.page_size]),
+                    options.repeat
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Процессорное время сериализации страницы рецептов.
+
+Страница списка для авторизованного пользователя сериализуется тремя
+способами: полностью через RecipeListSerializer, как до кэша
+представлений, и через CachedRecipesListSerializer с пустым и с
+заполненным кэшем. Во всех случаях страница уже загружена из базы,
+а время считается по time.process_time. Промах кэша включает
+подгрузку ингредиентов и тегов и запись в кэш.
+"""
+import time
+from io import StringIO
+
+from benchmarks.base import measure, parser, report, setup, test_database
+
+
+def populate(recipes, ingredients_per_recipe):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+
+    from food_api.tests.base import INGREDIENTS_PATH
+    from recipes.models import Ingredients, IngredientsRecipes, Recipes, Tags
+
+    User = get_user_model()
+    call_command('ingredientadd', INGREDIENTS_PATH, stdout=StringIO())
+    ingredients = list(Ingredients.objects.order_by('id')[:500])
+    tags = [
+        Tags.objects.create(
+            name=f'Тег {number}',
+            color=f'#00000{number}',
+            slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+    author = User.objects.create_user(
+        username='author',
+        email='author@example.com',
+        first_name='Author',
+        last_name='Author'
+    )
+    created = Recipes.objects.bulk_create(
+        Recipes(
+            author=author,
+            name=f'Рецепт {number}',
+            text='Описание рецепта',
+            image='recipes/images/recipe.png',
+            cooking_time=10
+        )
+        for number in range(recipes)
+    )
+    Recipes.tags.through.objects.bulk_create(
+        Recipes.tags.through(recipes_id=recipe.id, tags_id=tag.id)
+        for recipe in created
+        for tag in tags[:2]
+    )
+    IngredientsRecipes.objects.bulk_create(
+        IngredientsRecipes(
+            recipe=recipe,
+            ingredient=ingredients[(number * 7 + shift) % len(ingredients)],
+            amount=10
+        )
+        for number, recipe in enumerate(created)
+        for shift in range(ingredients_per_recipe)
+    )
+    return User.objects.create_user(
+        username='reader',
+        email='reader@example.com',
+        first_name='Reader',
+        last_name='Reader'
+    )
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.add_argument(
+        '--page-sizes',
+        type=int,
+        nargs='+',
+        default=[6, 24, 100]
+    )
+    arguments.add_argument('--ingredients', type=int, default=10)
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        from django.conf import settings
+        from django.core.cache import cache
+        from django.db.models import prefetch_related_objects
+        from rest_framework.request import Request
+        from rest_framework.serializers import ListSerializer
+        from rest_framework.test import APIRequestFactory, force_authenticate
+
+        from food_api.serializers import (
+            RecipeListSerializer,
+            recipe_prefetches
+        )
+        from food_api.views import RecipesViewSet
+
+        user = populate(max(options.page_sizes), options.ingredients)
+        request = APIRequestFactory().get('/api/recipes/')
+        force_authenticate(request, user)
+        view = RecipesViewSet(action='list', format_kwarg=None, kwargs={})
+        view.request = Request(request)
+        view.request.user = user
+        context = {'request': view.request, 'view': view}
+        print(f'cache backend {settings.CACHES["default"]["BACKEND"]}')
+        for size in options.page_sizes:
+            queryset = view.get_queryset()[:size]
+            full_page = list(queryset)
+            prefetch_related_objects(full_page, *recipe_prefetches())
+            cached_page = list(queryset)
+
+            def full():
+                return ListSerializer(
+                    full_page,
+                    child=RecipeListSerializer(context=context),
+                    context=context
+                ).data
+
+            def cached():
+                return RecipeListSerializer(
+                    cached_page,
+                    many=True,
+                    context=context
+                ).data
+
+            def clear():
+                cache.clear()
+                for recipe in cached_page:
+                    getattr(recipe, '_prefetched_objects_cache', {}).clear()
+
+            assert full() == cached()
+            for name, func, before in (
+                ('full serialization', full, None),
+                ('cache miss', cached, clear),
+                ('cache hit', cached, None),
+            ):
+                report(f'{size} recipes, {name}', measure(
+                    func,
+                    options.repeat,
+                    timer=time.process_time,
+                    before=before
+                ))
+
+
+if __name__ == '__main__':
+    main()
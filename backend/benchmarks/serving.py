@@ -0,0 +1,240 @@
+"""Нагрузочное сравнение режимов WSGI и ASGI.
+
+Для каждого режима SERVER_MODE запускается gunicorn с gunicorn.conf.py
+на временной тестовой базе, и потоки нагрузки с постоянными
+соединениями по кругу запрашивают список и рецепт, теги, поиск
+ингредиентов и скачивание списка покупок. Для каждого адреса выводятся
+число запросов в секунду, медиана и 99-й перцентиль задержки.
+"""
+import http.client
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from io import StringIO
+from pathlib import Path
+
+from benchmarks.base import parser, setup, test_database
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+MODES = ('wsgi', 'asgi')
+
+
+def populate(recipes, authors, cart_size):
+    from django.contrib.auth import get_user_model
+    from django.core.management import call_command
+    from rest_framework.authtoken.models import Token
+
+    from food_api.tests.base import INGREDIENTS_PATH
+    from recipes.models import (
+        Carts,
+        Ingredients,
+        IngredientsRecipes,
+        Recipes,
+        Tags
+    )
+
+    User = get_user_model()
+    call_command('ingredientadd', INGREDIENTS_PATH, stdout=StringIO())
+    ingredients = list(Ingredients.objects.order_by('id')[:500])
+    tags = [
+        Tags.objects.create(
+            name=f'Тег {number}',
+            color=f'#00000{number}',
+            slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+    authors = User.objects.bulk_create(
+        User(
+            username=f'author{number}',
+            email=f'author{number}@example.com',
+            first_name='Author',
+            last_name=str(number)
+        )
+        for number in range(authors)
+    )
+    created = Recipes.objects.bulk_create(
+        Recipes(
+            author=authors[number % len(authors)],
+            name=f'Рецепт {number}',
+            text='Описание рецепта',
+            image='recipes/images/recipe.png',
+            cooking_time=10
+        )
+        for number in range(recipes)
+    )
+    Recipes.tags.through.objects.bulk_create(
+        Recipes.tags.through(
+            recipes_id=recipe.id,
+            tags_id=tags[number % len(tags)].id
+        )
+        for number, recipe in enumerate(created)
+    )
+    IngredientsRecipes.objects.bulk_create(
+        IngredientsRecipes(
+            recipe=recipe,
+            ingredient=ingredients[(number * 7 + shift) % len(ingredients)],
+            amount=10
+        )
+        for number, recipe in enumerate(created)
+        for shift in range(5)
+    )
+    reader = User.objects.create_user(
+        username='reader',
+        email='reader@example.com',
+        first_name='Reader',
+        last_name='Reader'
+    )
+    Carts.objects.bulk_create(
+        Carts(user=reader, recipe=recipe) for recipe in created[:cart_size]
+    )
+    call_command('counterrebuild', stdout=StringIO())
+    call_command('cartrebuild', stdout=StringIO())
+    return Token.objects.create(user=reader).key, created[0].id
+
+
+def start_server(mode, port, workers, database):
+    env = {
+        **os.environ,
+        'SERVER_MODE': mode,
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': str(workers),
+        'POSTGRES_DB': database,
+        'ALLOWED_HOSTS': '127.0.0.1',
+        'CACHE_LOCATION': tempfile.mkdtemp(),
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn'],
+        cwd=BACKEND_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port)
+            connection.request('GET', '/api/tags/')
+            if connection.getresponse().status == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'gunicorn did not start in {mode} mode.')
+
+
+def load(port, paths, concurrency, duration):
+    """Задержки ответов по адресам за duration секунд нагрузки."""
+    latencies = defaultdict(list)
+    errors = []
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def client(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        local = defaultdict(list)
+        number = offset
+        while time.monotonic() < deadline:
+            path, headers = paths[number % len(paths)]
+            number += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                errors.append(error)
+                continue
+            if response.status != 200:
+                errors.append(f'{path}: {response.status}')
+                continue
+            local[path].append(time.perf_counter() - started)
+        with lock:
+            for path, values in local.items():
+                latencies[path].extend(values)
+
+    threads = [
+        threading.Thread(target=client, args=(number,))
+        for number in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.add_argument('--duration', type=float, default=10)
+    arguments.add_argument('--concurrency', type=int, default=16)
+    arguments.add_argument('--workers', type=int, default=2)
+    arguments.add_argument('--port', type=int, default=5100)
+    arguments.add_argument('--recipes', type=int, default=1000)
+    arguments.add_argument('--cart-size', type=int, default=50)
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        from django.conf import settings
+        from django.db import connections
+
+        token, recipe_id = populate(options.recipes, 50, options.cart_size)
+        connections.close_all()
+        database = settings.DATABASES['default']['NAME']
+        authorization = {'Authorization': f'Token {token}'}
+        paths = [
+            ('/api/recipes/?limit=6', {}),
+            ('/api/recipes/?limit=6&page=3', authorization),
+            (f'/api/recipes/{recipe_id}/', {}),
+            ('/api/tags/', {}),
+            ('/api/ingredients/?name=%D0%BC%D1%83%D0%BA', {}),
+            ('/api/recipes/download_shopping_cart/', authorization),
+        ]
+        for mode in MODES:
+            server = start_server(
+                mode,
+                options.port,
+                options.workers,
+                database
+            )
+            try:
+                latencies, errors = load(
+                    options.port,
+                    paths,
+                    options.concurrency,
+                    options.duration
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            total = sum(len(values) for values in latencies.values())
+            print(
+                f'{mode}: {total / options.duration:.0f} requests/s, '
+                f'{len(errors)} errors, {options.workers} workers, '
+                f'{options.concurrency} clients'
+            )
+            for path, _ in paths:
+                values = latencies[path]
+                if not values:
+                    print(f'  {path:<45} no responses')
+                    continue
+                print(
+                    f'  {path:<45} {len(values) / options.duration:7.1f}/s'
+                    f'   p50 {statistics.median(values) * 1000:7.1f} ms'
+                    f'   p99 {percentile(values, 0.99) * 1000:7.1f} ms'
+                )
+
+
+if __name__ == '__main__':
+    main()
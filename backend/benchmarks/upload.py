@@ -0,0 +1,149 @@
+"""Пиковый RSS процесса на одну загрузку рецепта с изображением.
+
+Тело запроса готовится заранее, а каждая загрузка выполняется в
+отдельном дочернем процессе, который отправляет POST /api/recipes/ и
+сообщает, на сколько пиковый RSS (VmHWM) превысил RSS до запроса. Режим
+bounded - текущие RecipeJSONParser, отклоняющий слишком большое тело по
+Content-Length, и Base64ImageField с проверкой размера и декодированием
+частями во временный файл, режим naive - декодирование всей строки в
+память без ограничения размера, как было до них.
+"""
+import json
+import multiprocessing
+import os
+import tempfile
+from base64 import b64decode, b64encode
+from contextlib import ExitStack
+from io import BytesIO, StringIO
+from unittest import mock
+
+from benchmarks.base import parser, setup, test_database
+
+MEGABYTE = 1024 * 1024
+
+
+def png_base64(size):
+    """PNG из шума примерно заданного размера в виде data URL."""
+    from PIL import Image
+
+    side = int((size / 3) ** 0.5)
+    buffer = BytesIO()
+    Image.frombytes('RGB', (side, side), os.urandom(side * side * 3)).save(
+        buffer,
+        'PNG',
+        compress_level=0
+    )
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def naive_decode(field, data):
+    try:
+        return BytesIO(b64decode(data, validate=True))
+    except ValueError:
+        field.fail('invalid_base64')
+
+
+def memory_status():
+    """VmRSS и VmHWM текущего процесса в байтах (только Linux)."""
+    values = {}
+    with open('/proc/self/status') as status:
+        for line in status:
+            name, _, value = line.partition(':')
+            if name in ('VmRSS', 'VmHWM'):
+                values[name] = int(value.split()[0]) * 1024
+    return values['VmRSS'], values['VmHWM']
+
+
+def upload(mode, token, body):
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+    patches = [
+        mock.patch('recipes.images.executor'),
+        override_settings(MEDIA_ROOT=tempfile.mkdtemp()),
+    ]
+    if mode == 'naive':
+        patches += [
+            mock.patch(
+                'food_api.fields.Base64ImageField.decode',
+                naive_decode
+            ),
+            override_settings(MAX_IMAGE_UPLOAD_SIZE=1024 * MEGABYTE),
+        ]
+    with ExitStack() as stack:
+        for patch in patches:
+            stack.enter_context(patch)
+        before, _ = memory_status()
+        response = client.post(
+            '/api/recipes/',
+            body,
+            content_type='application/json'
+        )
+        _, peak = memory_status()
+    return response.status_code, peak - before
+
+
+def main():
+    arguments = parser(__doc__.splitlines()[0])
+    arguments.add_argument(
+        '--sizes',
+        type=float,
+        nargs='+',
+        default=[0.5, 2, 4.5, 20],
+        help='Image sizes in megabytes.'
+    )
+    options = arguments.parse_args()
+    setup()
+    with test_database():
+        from django.core.management import call_command
+        from django.db import connections
+        from rest_framework.authtoken.models import Token
+
+        from food_api.tests.base import INGREDIENTS_PATH
+        from recipes.models import Ingredients, Tags
+        from users.models import User
+
+        call_command('ingredientadd', INGREDIENTS_PATH, stdout=StringIO())
+        user = User.objects.create_user(
+            username='uploader',
+            email='uploader@example.com',
+            first_name='Uploader',
+            last_name='Uploader'
+        )
+        token = Token.objects.create(user=user).key
+        data = {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'tags': [Tags.objects.create(
+                name='Завтрак',
+                color='#E26C2D',
+                slug='breakfast'
+            ).id],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 10}
+                for ingredient_id in Ingredients.objects.values_list(
+                    'id',
+                    flat=True
+                )[:3]
+            ],
+        }
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        for size in options.sizes:
+            body = json.dumps(
+                {**data, 'image': png_base64(int(size * MEGABYTE))}
+            ).encode()
+            for mode in ('naive', 'bounded'):
+                with context.Pool(1) as pool:
+                    status, rss = pool.apply(upload, (mode, token, body))
+                print(
+                    f'{size:5.1f} MB image   {mode:<8} status {status}   '
+                    f'peak RSS +{rss / MEGABYTE:7.1f} MB'
+                )
+
+
+if __name__ == '__main__':
+    main()
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FoodApiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'food_api'
+
+    def ready(self):
+        import food_api.signals  # noqa: F401
@@ -0,0 +1,231 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import cached_property
+from hashlib import md5
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import http_date, quote_etag
+
+from food_api.metrics import response_cache_requests
+from recipes.models import Ingredients, Tags
+
+
+class ReferenceData:
+    def __init__(self, name, version, items):
+        self.name = name
+        self.version = version
+        self.items = items
+
+    @cached_property
+    def by_id(self):
+        return {item['id']: item for item in self.items}
+
+    @property
+    def etag(self):
+        return quote_etag(f'{self.name}-{self.version}')
+
+    @property
+    def last_modified(self):
+        return self.version // 1000
+
+    @property
+    def headers(self):
+        return {
+            'ETag': self.etag,
+            'Last-Modified': http_date(self.last_modified),
+        }
+
+
+def normalize_name(name):
+    return name.casefold().replace('ё', 'е')
+
+
+class IngredientsData(ReferenceData):
+    @cached_property
+    def search_index(self):
+        return sorted(
+            (normalize_name(item['name']), position)
+            for position, item in enumerate(self.items)
+        )
+
+    @cached_property
+    def search_keys(self):
+        return [key for key, _ in self.search_index]
+
+    def search(self, query, limit=None):
+        """Поиск по началу названия, затем по вхождению в название."""
+        query = normalize_name(query)
+        start = bisect_left(self.search_keys, query)
+        positions = []
+        for key, position in self.search_index[start:]:
+            if not key.startswith(query) or len(positions) == limit:
+                break
+            positions.append(position)
+        if limit is None or len(positions) < limit:
+            for key, position in self.search_index:
+                if query in key and not key.startswith(query):
+                    positions.append(position)
+                    if len(positions) == limit:
+                        break
+        return [self.items[position] for position in positions]
+
+
+class VersionedCache:
+    """Версия (время последнего изменения в миллисекундах) в общем кэше."""
+
+    key_prefix = None
+
+    def __init__(self, name):
+        self.name = name
+
+    @property
+    def version_key(self):
+        return f'{self.key_prefix}:{self.name}:version'
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, int(time.time() * 1000), None)
+            version = cache.get(self.version_key)
+        return version
+
+    async def aget_version(self):
+        version = await cache.aget(self.version_key)
+        if version is None:
+            await cache.aadd(self.version_key, int(time.time() * 1000), None)
+            version = await cache.aget(self.version_key)
+        return version
+
+    def invalidate(self):
+        version = cache.get(self.version_key) or 0
+        cache.set(
+            self.version_key,
+            max(version + 1, int(time.time() * 1000)),
+            None
+        )
+
+
+class ReferenceCache(VersionedCache):
+    """Версионированный кэш справочника.
+
+    Данные хранятся и в общем кэше, и в LRU текущего процесса.
+    """
+
+    key_prefix = 'reference'
+
+    def __init__(self, name, loader, data_class=ReferenceData, maxsize=4):
+        super().__init__(name)
+        self.loader = loader
+        self.data_class = data_class
+        self.maxsize = maxsize
+        self.local = OrderedDict()
+        self.lock = Lock()
+
+    def data_key(self, version):
+        return f'{self.key_prefix}:{self.name}:{version}'
+
+    def get(self):
+        version = self.get_version()
+        data = self.get_local(version)
+        if data is not None:
+            return data
+        items = cache.get(self.data_key(version))
+        if items is None:
+            items = self.loader()
+            cache.set(self.data_key(version), items)
+        return self.set_local(version, items)
+
+    async def aget(self):
+        """То же, что get, для асинхронных представлений."""
+        version = await self.aget_version()
+        data = self.get_local(version)
+        if data is not None:
+            return data
+        items = await cache.aget(self.data_key(version))
+        if items is None:
+            items = await sync_to_async(self.loader)()
+            await cache.aset(self.data_key(version), items)
+        return self.set_local(version, items)
+
+    def get_local(self, version):
+        with self.lock:
+            data = self.local.get(version)
+            if data is not None:
+                self.local.move_to_end(version)
+            return data
+
+    def set_local(self, version, items):
+        data = self.data_class(self.name, version, items)
+        with self.lock:
+            self.local[version] = data
+            while len(self.local) > self.maxsize:
+                self.local.popitem(last=False)
+        return data
+
+
+class ResponseCache(VersionedCache):
+    """Кэш данных ответа по нормализованным параметрам запроса.
+
+    Построить отсутствующую страницу может только один процесс, остальные
+    ждут её появления не дольше lock_timeout.
+    """
+
+    key_prefix = 'response'
+    poll_interval = 0.05
+
+    def __init__(self, name, timeout, lock_timeout=5):
+        super().__init__(name)
+        self.timeout = timeout
+        self.lock_timeout = lock_timeout
+
+    def digest(self, version, params):
+        return md5(f'{version}:{params!r}'.encode()).hexdigest()
+
+    def etag(self, version, params):
+        return quote_etag(f'{self.name}-{self.digest(version, params)}')
+
+    def get_or_build(self, version, params, build):
+        key = f'{self.key_prefix}:{self.name}:{self.digest(version, params)}'
+        data = cache.get(key)
+        if data is not None:
+            response_cache_requests.increment(self.name, 'hit')
+            return data, 'HIT'
+        lock_key = f'{key}:lock'
+        locked = cache.add(lock_key, 1, self.lock_timeout)
+        if not locked:
+            deadline = time.monotonic() + self.lock_timeout
+            while time.monotonic() < deadline:
+                time.sleep(self.poll_interval)
+                data = cache.get(key)
+                if data is not None:
+                    response_cache_requests.increment(self.name, 'wait')
+                    return data, 'HIT'
+        try:
+            data = build()
+            cache.set(key, data, self.timeout)
+        finally:
+            if locked:
+                cache.delete(lock_key)
+        response_cache_requests.increment(self.name, 'miss')
+        return data, 'MISS'
+
+
+tags_cache = ReferenceCache(
+    'tags',
+    lambda: list(Tags.objects.values('id', 'name', 'color', 'slug'))
+)
+ingredients_cache = ReferenceCache(
+    'ingredients',
+    lambda: list(Ingredients.objects.values(
+        'id', 'name', 'measurement_unit'
+    )),
+    data_class=IngredientsData
+)
+recipes_list_cache = ResponseCache(
+    'recipes',
+    timeout=settings.RECIPES_CACHE_TIMEOUT
+)
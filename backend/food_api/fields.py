@@ -0,0 +1,79 @@
+import binascii
+import uuid
+from base64 import b64decode
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+from rest_framework.fields import ImageField
+
+DECODE_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+IMAGE_EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+
+
+class Base64ImageField(ImageField):
+    """Изображение в base64 с ограничением размера.
+
+    Размер проверяется по длине строки до декодирования, сама строка
+    декодируется частями во временный файл, который Pillow проверяет
+    без полной загрузки в память.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Image is not valid base64 data.',
+        'too_large': 'Image size can not exceed {max_size} bytes.',
+        'invalid_format': 'Unsupported image format.',
+    }
+
+    def __init__(self, *args, max_size=None, **kwargs):
+        self.max_size = max_size or settings.MAX_IMAGE_UPLOAD_SIZE
+        super().__init__(*args, **kwargs)
+
+    def to_internal_value(self, data):
+        if not isinstance(data, str):
+            self.fail('invalid_base64')
+        if data.startswith('data:'):
+            _, _, data = data.partition(';base64,')
+        data = data.strip()
+        if len(data) // 4 * 3 > self.max_size:
+            self.fail('too_large', max_size=self.max_size)
+        file = self.decode(data)
+        try:
+            image = Image.open(file)
+            image.verify()
+        except Exception:
+            file.close()
+            self.fail('invalid_image')
+        extension = IMAGE_EXTENSIONS.get(image.format)
+        if extension is None:
+            file.close()
+            self.fail('invalid_format')
+        size = file.seek(0, 2)
+        file.seek(0)
+        return UploadedFile(
+            file=file,
+            name=f'{uuid.uuid4()}.{extension}',
+            content_type=Image.MIME[image.format],
+            size=size
+        )
+
+    def decode(self, data):
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        chunk_size = DECODE_CHUNK_SIZE - DECODE_CHUNK_SIZE % 4
+        try:
+            for start in range(0, len(data), chunk_size):
+                file.write(b64decode(
+                    data[start:start + chunk_size], validate=True
+                ))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid_base64')
+        file.seek(0)
+        return file
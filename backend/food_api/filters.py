@@ -1,26 +1,57 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections
+from django.db.models import Case, Exists, F, Func, OuterRef, Q, When
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import OrderingFilter
 
-from recipes.models import Ingredients, Recipes, Tags
+from food_api.cache import tags_cache
+from recipes.models import (
+    SEARCH_CONFIG,
+    Carts,
+    Favorites,
+    IngredientsRecipes,
+    Recipes
+)
 
 User = get_user_model()
 
 
-class IngredientFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='startswith')
+class Casefold(Func):
+    """casefold() строки, функция регистрируется для SQLite в signals."""
+
+    function = 'casefold'
+
+
+class IdOrderingFilter(OrderingFilter):
+    """Сортировка с id по убыванию для одинаковых значений.
+
+    Без него рецепты с равными счётчиками идут в произвольном порядке
+    и могут повторяться или пропадать между страницами.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if ordering and not {'id', '-id'} & set(ordering):
+            ordering = [*ordering, '-id']
+        return ordering
 
-    class Meta:
-        model = Ingredients
-        fields = ['name']
+
+def tag_ids_by_slug():
+    return {tag['slug']: tag['id'] for tag in tags_cache.get().items}
+
+
+def tag_choices():
+    return [(slug, slug) for slug in tag_ids_by_slug()]
 
 
 class RecipeFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        field_name='tags__slug',
-        to_field_name='slug',
-        queryset=Tags.objects.all(),
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method='filter_tags'
     )
 
+    search = filters.CharFilter(method='filter_search')
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
@@ -28,16 +59,67 @@ class RecipeFilter(FilterSet):
 
     class Meta:
         model = Recipes
-        fields = ('tags', 'author', 'is_favorited', 'is_in_shopping_cart',)
+        fields = (
+            'tags',
+            'author',
+            'search',
+            'is_favorited',
+            'is_in_shopping_cart',
+        )
+
+    def filter_tags(self, queryset, name, value):
+        if not value:
+            return queryset
+        tag_ids = tag_ids_by_slug()
+        return queryset.filter(Exists(
+            Recipes.tags.through.objects.filter(
+                recipes_id=OuterRef('id'),
+                tags_id__in=[tag_ids[slug] for slug in value]
+            )
+        ))
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        if connections[queryset.db].vendor == 'postgresql':
+            query = SearchQuery(
+                value,
+                config=SEARCH_CONFIG,
+                search_type='websearch'
+            )
+            return queryset.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-id')
+        value = value.casefold()
+        return queryset.alias(
+            folded_name=Casefold('name'),
+            folded_text=Casefold('text')
+        ).filter(
+            Q(folded_name__contains=value)
+            | Q(folded_text__contains=value)
+            | Exists(IngredientsRecipes.objects.alias(
+                folded_name=Casefold('ingredient__name')
+            ).filter(
+                recipe=OuterRef('id'),
+                folded_name__contains=value
+            ))
+        ).annotate(
+            rank=Case(When(folded_name__contains=value, then=1), default=0)
+        ).order_by('-rank', '-id')
 
     def filter_is_favorited(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(favorites__user=user)
+            return queryset.filter(Exists(
+                Favorites.objects.filter(recipe=OuterRef('id'), user=user)
+            ))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and not user.is_anonymous:
-            return queryset.filter(carts__user=user)
+            return queryset.filter(Exists(
+                Carts.objects.filter(recipe=OuterRef('id'), user=user)
+            ))
         return queryset
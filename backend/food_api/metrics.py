@@ -0,0 +1,129 @@
+"""Метрики запросов в текстовом формате Prometheus.
+
+Значения хранятся в памяти процесса. Под gunicorn с несколькими
+воркерами каждый запрос к /api/metrics/ отдаёт метрики одного
+случайного воркера, поэтому у всех рядов есть метка worker с pid
+процесса: ряды разных воркеров не смешиваются, а суммы по воркерам
+считаются в Prometheus (sum without (worker)). Чтобы видеть все
+воркеры, их нужно опрашивать по отдельности или запускать контейнер
+с GUNICORN_WORKERS=1 и масштабировать контейнерами.
+"""
+import os
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+def worker_label():
+    return f'worker="{os.getpid()}"'
+
+
+class Histogram:
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.values = defaultdict(self.empty)
+        self.lock = Lock()
+
+    def empty(self):
+        return [[0] * (len(self.buckets) + 1), 0, 0]
+
+    def observe(self, view, value):
+        position = bisect_left(self.buckets, value)
+        with self.lock:
+            counts, _, _ = series = self.values[view]
+            counts[position] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            values = {
+                view: (list(counts), total, count)
+                for view, (counts, total, count) in self.values.items()
+            }
+        for view, (counts, total, count) in sorted(values.items()):
+            label = f'{worker_label()},view="{view}"'
+            cumulative = 0
+            for bucket, bucket_count in zip(
+                self.buckets + ('+Inf',), counts
+            ):
+                cumulative += bucket_count
+                lines.append(
+                    f'{self.name}_bucket{{{label},le="{bucket}"}} '
+                    f'{cumulative}'
+                )
+            lines.append(f'{self.name}_sum{{{label}}} {total}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+        return '\n'.join(lines)
+
+
+class Counter:
+    def __init__(self, name, description, labels):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values = defaultdict(int)
+        self.lock = Lock()
+
+    def increment(self, *label_values):
+        with self.lock:
+            self.values[label_values] += 1
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.description}',
+            f'# TYPE {self.name} counter',
+        ]
+        with self.lock:
+            values = dict(self.values)
+        for label_values, count in sorted(values.items()):
+            labels = ','.join((worker_label(), *(
+                f'{label}="{value}"'
+                for label, value in zip(self.labels, label_values)
+            )))
+            lines.append(f'{self.name}_total{{{labels}}} {count}')
+        return '\n'.join(lines)
+
+
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Time spent handling the request.',
+    DURATION_BUCKETS
+)
+request_queries = Histogram(
+    'foodgram_request_queries',
+    'Number of SQL queries per sampled request.',
+    QUERY_BUCKETS
+)
+request_sql_duration = Histogram(
+    'foodgram_request_sql_duration_seconds',
+    'Time spent in SQL per sampled request.',
+    DURATION_BUCKETS
+)
+response_cache_requests = Counter(
+    'foodgram_response_cache_requests',
+    'Response cache lookups by result.',
+    ('cache', 'result')
+)
+
+METRICS = (
+    request_duration,
+    request_queries,
+    request_sql_duration,
+    response_cache_requests
+)
+
+
+def render_metrics():
+    return '\n'.join(metric.render() for metric in METRICS) + '\n'
@@ -0,0 +1,161 @@
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from heapq import nsmallest
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from food_api.metrics import (
+    request_duration,
+    request_queries,
+    request_sql_duration
+)
+
+logger = logging.getLogger('food_api.metrics')
+
+
+def view_name(request, view_func):
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return f'{view_func.__module__}.{view_func.__name__}'
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        action = actions.get(request.method.lower())
+        return f'{view_class.__name__}.{action}'
+    return view_class.__name__
+
+
+class QueryRecorder:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - started
+            self.count += 1
+            self.duration += duration
+            self.queries.append((duration, sql))
+
+    def slowest(self, number):
+        return nsmallest(number, self.queries, key=lambda query: -query[0])
+
+
+@contextmanager
+def serialize_timer(request):
+    """Учитывает время сериализации в метриках выбранного запроса.
+
+    SQL-запросы сериализатора остаются в db, вложенные сериализаторы
+    не учитываются повторно.
+    """
+    request = getattr(request, '_request', request)
+    recorder = getattr(request, 'metrics_recorder', None)
+    if recorder is None or request.metrics_serializing:
+        yield
+        return
+    request.metrics_serializing = True
+    started, sql_started = time.perf_counter(), recorder.duration
+    try:
+        yield
+    finally:
+        request.metrics_serializing = False
+        request.metrics_serialize_time += (
+            time.perf_counter() - started - (recorder.duration - sql_started)
+        )
+
+
+class RequestMetricsMiddleware:
+    """Время обработки запроса, SQL-запросы и размер ответа.
+
+    Длительность запроса учитывается всегда, SQL-запросы, время
+    сериализации и кодирования ответа и логирование - только для доли
+    запросов METRICS_SAMPLE_RATE. Сериализация (serialize) - это
+    to_representation сериализаторов рецептов без их SQL-запросов,
+    кодирование (encode) - только работа рендерера DRF над готовыми
+    данными.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() >= settings.METRICS_SAMPLE_RATE:
+            response = self.get_response(request)
+            self.observe(request, time.perf_counter() - started)
+            return response
+        recorder = QueryRecorder()
+        request.metrics_recorder = recorder
+        request.metrics_serializing = False
+        request.metrics_serialize_time = 0
+        request.metrics_encode_time = 0
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        view = self.observe(request, duration)
+        if view is not None:
+            request_queries.observe(view, recorder.count)
+            request_sql_duration.observe(view, recorder.duration)
+        serialize_time = request.metrics_serialize_time
+        encode_time = request.metrics_encode_time
+        app_time = duration - recorder.duration - serialize_time - encode_time
+        response['Server-Timing'] = ', '.join((
+            f'db;desc="{recorder.count} queries";'
+            f'dur={recorder.duration * 1000:.1f}',
+            f'app;dur={app_time * 1000:.1f}',
+            f'serialize;desc="without SQL";dur={serialize_time * 1000:.1f}',
+            f'encode;desc="renderer only";dur={encode_time * 1000:.1f}',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 1),
+            'queries': recorder.count,
+            'sql_ms': round(recorder.duration * 1000, 1),
+            'serialize_ms': round(serialize_time * 1000, 1),
+            'encode_ms': round(encode_time * 1000, 1),
+            'response_size': (
+                None if response.streaming else len(response.content)
+            ),
+            'slowest_queries': [
+                {'ms': round(query_duration * 1000, 1), 'sql': sql[:300]}
+                for query_duration, sql in recorder.slowest(
+                    settings.METRICS_SLOW_QUERIES
+                )
+            ],
+        }, ensure_ascii=False))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.view_name = view_name(request, view_func)
+
+    def process_template_response(self, request, response):
+        if hasattr(request, 'metrics_encode_time'):
+            encode_started = time.perf_counter()
+
+            def finish_encode(response):
+                request.metrics_encode_time = (
+                    time.perf_counter() - encode_started
+                )
+
+            response.add_post_render_callback(finish_encode)
+        return response
+
+    def observe(self, request, duration):
+        view = getattr(request, 'view_name', None)
+        if view is not None:
+            request_duration.observe(view, duration)
+        return view
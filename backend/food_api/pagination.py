@@ -1,6 +1,141 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по плану запроса PostgreSQL."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    return plan[0]['Plan']['Plan Rows']
+
+
+class EstimatedCountPaginator(Paginator):
+    exact_count_threshold = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+
+
+class KeysetPagination(CursorPagination):
+    ordering = '-id'
+    page_size = 6
+    page_size_query_param = 'limit'
+
+
+class FeedPagination(BasePagination):
+    """Пагинация ленты по идентификаторам рецептов.
+
+    Страница выбирается функцией get_ids(limit, before, after), которая
+    возвращает первые limit идентификаторов по убыванию, а при after -
+    по возрастанию.
+    Рецепты страницы загружаются одним запросом по этим идентификаторам.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    before_query_param = 'before'
+    after_query_param = 'after'
+    invalid_position_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def get_position(self, request, param):
+        if param not in request.query_params:
+            return None
+        try:
+            return int(request.query_params[param])
+        except ValueError:
+            raise NotFound(self.invalid_position_message)
+
+    def paginate_queryset(self, queryset, request, view=None, get_ids=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        before = self.get_position(request, self.before_query_param)
+        after = None
+        if before is None:
+            after = self.get_position(request, self.after_query_param)
+        ids = list(get_ids(limit=page_size + 1, before=before, after=after))
+        has_more = len(ids) > page_size
+        ids = ids[:page_size]
+        if after is not None:
+            ids.reverse()
+        self.next_position = self.previous_position = None
+        if not ids:
+            return []
+        if after is not None or has_more:
+            self.next_position = ids[-1]
+        if before is not None or (after is not None and has_more):
+            self.previous_position = ids[0]
+        return list(queryset.filter(id__in=ids).order_by('-id'))
+
+    def get_link(self, param, position):
+        if position is None:
+            return None
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.before_query_param)
+        url = remove_query_param(url, self.after_query_param)
+        return replace_query_param(url, param, position)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_link(
+                self.before_query_param, self.next_position
+            ),
+            'previous': self.get_link(
+                self.after_query_param, self.previous_position
+            ),
+            'results': data,
+        })
 
 
 class PageSizePagination(PageNumberPagination):
     page_size_query_param = 'limit'
     page_size = 6
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    def __init__(self):
+        self.keyset = None
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param in request.query_params:
+            # Курсор задаёт свой порядок по id, и порядок поиска по
+            # релевантности или ?ordering= был бы молча потерян.
+            ordering = queryset.query.order_by
+            if ordering and ordering != (KeysetPagination.ordering,):
+                raise ValidationError({
+                    self.cursor_query_param: 'Cursor pagination can not be '
+                    'combined with search or ordering, use page instead.'
+                })
+            self.keyset = KeysetPagination()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.count_query_param) == 'estimate':
+            self.django_paginator_class = EstimatedCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
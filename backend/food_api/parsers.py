@@ -0,0 +1,37 @@
+from django.conf import settings
+from rest_framework.exceptions import APIException
+from rest_framework.parsers import JSONParser
+
+# Запас на префикс data URL и остальные поля рецепта.
+REQUEST_SIZE_MARGIN = 256 * 1024
+
+
+class RequestTooLarge(APIException):
+    status_code = 413
+    default_detail = 'Request body can not exceed {max_size} bytes.'
+    default_code = 'request_too_large'
+
+    def __init__(self, max_size):
+        super().__init__(self.default_detail.format(max_size=max_size))
+
+
+class RecipeJSONParser(JSONParser):
+    """JSON рецепта с ограничением размера тела.
+
+    Тело больше изображения MAX_IMAGE_UPLOAD_SIZE в base64 с запасом
+    отклоняется по Content-Length до чтения и разбора.
+    """
+
+    def max_size(self):
+        return settings.MAX_IMAGE_UPLOAD_SIZE * 4 // 3 + REQUEST_SIZE_MARGIN
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        request = parser_context['request']
+        try:
+            length = int(request.META.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        max_size = self.max_size()
+        if length > max_size:
+            raise RequestTooLarge(max_size)
+        return super().parse(stream, media_type, parser_context)
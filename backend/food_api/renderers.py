@@ -0,0 +1,87 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return JSONRenderer().render(data)
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    def header(self):
+        return ''
+
+    def row(self, ingredient, index):
+        raise NotImplementedError
+
+    def footer(self):
+        return ''
+
+    def stream(self, ingredients):
+        yield self.header()
+        for index, ingredient in enumerate(ingredients):
+            yield self.row(ingredient, index)
+        yield self.footer()
+
+    async def astream(self, ingredients):
+        yield self.header()
+        index = 0
+        async for ingredient in ingredients:
+            yield self.row(ingredient, index)
+            index += 1
+        yield self.footer()
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def header(self):
+        return 'Your personal shopping list:'
+
+    def row(self, ingredient, index):
+        return (
+            f'\n{ingredient["name"]} - '
+            f'{ingredient["amount"]} '
+            f'{ingredient["measurement_unit"]}'
+        )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    writer = csv.writer(Echo())
+
+    def header(self):
+        return self.writer.writerow(['name', 'amount', 'measurement_unit'])
+
+    def row(self, ingredient, index):
+        return self.writer.writerow([
+            ingredient['name'],
+            ingredient['amount'],
+            ingredient['measurement_unit']
+        ])
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def header(self):
+        return '['
+
+    def row(self, ingredient, index):
+        separator = ',' if index else ''
+        return separator + json.dumps(ingredient, ensure_ascii=False)
+
+    def footer(self):
+        return ']'
@@ -1,29 +1,37 @@
-import base64
+from hashlib import md5
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import Prefetch, prefetch_related_objects
 from django.db.transaction import atomic
 from djoser.serializers import (
     UserCreateSerializer as DjoserUserCreateSerializer,
     UserSerializer as DjoserUserSerializer
 )
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework.fields import (
+    ImageField,
     IntegerField,
+    ListField,
     SerializerMethodField,
     CharField,
     BooleanField
 )
 from rest_framework.exceptions import ValidationError
-from rest_framework.serializers import ModelSerializer
-from rest_framework.relations import PrimaryKeyRelatedField
-from rest_framework.status import HTTP_400_BAD_REQUEST
+from rest_framework.serializers import ListSerializer, ModelSerializer
 
+from food_api.cache import tags_cache
+from food_api.fields import Base64ImageField
+from food_api.middleware import serialize_timer
+from food_api.signals import AUTHOR_FIELDS, mark_version_bumped
+from recipes.images import schedule_image_processing
 from recipes.models import (
+    CartsIngredients,
     Recipes,
     Tags,
     Ingredients,
     IngredientsRecipes
 )
-from users.models import Subscribe
 
 
 User = get_user_model()
@@ -58,7 +66,7 @@ class UserCreateSerializer(DjoserUserCreateSerializer):
 
 
 class UserSerializer(DjoserUserSerializer):
-    is_subscribed = SerializerMethodField(read_only=True)
+    is_subscribed = BooleanField(read_only=True, default=False)
 
     class Meta:
         model = User
@@ -71,16 +79,10 @@ class UserSerializer(DjoserUserSerializer):
             'is_subscribed'
         ]
 
-    def get_is_subscribed(self, author):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscribe.objects.filter(user=user, author=author).exists()
-
 
 class SubscribeSerializer(UserSerializer):
     recipes = SerializerMethodField(read_only=True)
-    recipes_count = SerializerMethodField(read_only=True)
+    recipes_count = IntegerField(read_only=True, default=0)
 
     class Meta:
         model = User
@@ -96,31 +98,8 @@ class SubscribeSerializer(UserSerializer):
         ]
         read_only_fields = ('email', 'username')
 
-    def validate(self, data):
-        author = self.instance
-        user = self.context.get('request').user
-        if Subscribe.objects.filter(author=author, user=user).exists():
-            raise ValidationError(
-                detail='You already follow this user!',
-                code=HTTP_400_BAD_REQUEST
-            )
-        if user == author:
-            raise ValidationError(
-                detail='You can\'t follow yourself!',
-                code=HTTP_400_BAD_REQUEST
-            )
-        return data
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        recipes = obj.recipes.all()
-        recipes_limit = request.query_params.get('recipes_limit',)
-        if recipes_limit:
-            recipes = recipes[:int(recipes_limit)]
-        return RecipesShortSerializer(recipes, many=True).data
+        return RecipesShortSerializer(obj.recipes.all(), many=True).data
 
 
 class IngredientsRecipesAddSerializer(ModelSerializer):
@@ -158,14 +137,32 @@ class IngredientsRecipesSerializer(ModelSerializer):
         ]
 
 
-class RecipeSerializer(ModelSerializer):
+def recipe_prefetches():
+    return (
+        Prefetch(
+            'ingredientsrecipes',
+            queryset=IngredientsRecipes.objects.select_related('ingredient')
+        ),
+        'tags'
+    )
+
+
+class TimedSerializerMixin:
+    """Время to_representation попадает в метрики запроса."""
+
+    def to_representation(self, instance):
+        with serialize_timer(self.context.get('request')):
+            return super().to_representation(instance)
+
+
+class RecipeSerializer(TimedSerializerMixin, ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     author = UserSerializer(read_only=True)
     ingredients = IngredientsRecipesSerializer(
         many=True,
         source='ingredientsrecipes'
     )
-    image = Base64ImageField(required=False)
+    image = ImageField(read_only=True)
     is_favorited = BooleanField(read_only=True, default=False)
     is_in_shopping_cart = BooleanField(read_only=True, default=False)
     cooking_time = IntegerField(min_value=1)
@@ -186,11 +183,75 @@ class RecipeSerializer(ModelSerializer):
         ]
 
 
+class CachedRecipesListSerializer(TimedSerializerMixin, ListSerializer):
+    """Список рецептов из кэша представлений отдельных рецептов.
+
+    В кэше хранится часть представления, не зависящая от пользователя,
+    отметки избранного, корзины и подписки берутся из аннотаций рецепта.
+    """
+
+    def cache_key(self, recipe):
+        """Ключ по версии рецепта и полям автора в представлении."""
+        host = self.context['request'].get_host()
+        author = 'none'
+        if recipe.author is not None:
+            author = md5(
+                '\0'.join(
+                    str(getattr(recipe.author, field))
+                    for field in ('id', *AUTHOR_FIELDS)
+                ).encode()
+            ).hexdigest()
+        return f'recipe:{host}:{recipe.id}:{recipe.version}:{author}'
+
+    def to_representation(self, data):
+        recipes = list(data)
+        keys = {recipe.id: self.cache_key(recipe) for recipe in recipes}
+        cached = cache.get_many(keys.values())
+        missing = [
+            recipe for recipe in recipes if keys[recipe.id] not in cached
+        ]
+        if missing:
+            prefetch_related_objects(missing, *recipe_prefetches())
+            built = {
+                keys[recipe.id]: self.child.to_representation(recipe)
+                for recipe in missing
+            }
+            cache.set_many(built, settings.RECIPES_CACHE_TIMEOUT)
+            cached.update(built)
+        return [
+            self.overlay(cached[keys[recipe.id]], recipe)
+            for recipe in recipes
+        ]
+
+    def overlay(self, data, recipe):
+        return {
+            **data,
+            'author': {
+                **data['author'],
+                'is_subscribed': getattr(
+                    recipe,
+                    'author_is_subscribed',
+                    False
+                )
+            },
+            'is_favorited': getattr(recipe, 'is_favorited', False),
+            'is_in_shopping_cart': getattr(
+                recipe,
+                'is_in_shopping_cart',
+                False
+            )
+        }
+
+
+class RecipeListSerializer(RecipeSerializer):
+    image = ImageField(source='preview', read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        list_serializer_class = CachedRecipesListSerializer
+
+
 class RecipeAddSerializer(ModelSerializer):
-    tags = PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tags.objects.all()
-    )
+    tags = ListField(child=IntegerField(min_value=1))
     author = UserSerializer(read_only=True)
     ingredients = IngredientsRecipesAddSerializer(many=True)
     image = Base64ImageField()
@@ -218,11 +279,10 @@ class RecipeAddSerializer(ModelSerializer):
             raise ValidationError({
                 'tags': 'Tags must be unique!'
             })
-        for tag in unique_tags:
-            if not Tags.objects.filter(id=tag.id).exists():
-                raise ValidationError(
-                    'Can\'t add non-existing tag'
-                )
+        if unique_tags - tags_cache.get().by_id.keys():
+            raise ValidationError(
+                'Can\'t add non-existing tag'
+            )
         return value
 
     def validate_ingredients(self, value):
@@ -235,20 +295,22 @@ class RecipeAddSerializer(ModelSerializer):
                 raise ValidationError({
                     'amount': 'Ingredient amount has to be greater than 0!'
                 })
-        ingredients = list({ingredient['id'] for ingredient in value})
-        if not Ingredients.objects.filter(id__in=ingredients).exists():
-            raise ValidationError({
-                'ingredients': 'One or more ingredients do not exist!'
-            })
+        ingredients = {ingredient['id'] for ingredient in value}
         if len(value) != len(ingredients):
             raise ValidationError(
                 {'ingredients': 'Can\'t add repetative ingredients'}
             )
+        if ingredients - set(Ingredients.objects.filter(
+            id__in=ingredients
+        ).values_list('id', flat=True)):
+            raise ValidationError({
+                'ingredients': 'One or more ingredients do not exist!'
+            })
         return value
 
     def create_ingredients_amount(self, recipe, ingredients):
         all_ingredients = [IngredientsRecipes(
-            ingredient=Ingredients.objects.get(id=ingredient['id']),
+            ingredient_id=ingredient['id'],
             recipe=recipe,
             amount=ingredient['amount']
         ) for ingredient in ingredients]
@@ -264,21 +326,70 @@ class RecipeAddSerializer(ModelSerializer):
             recipe=recipe,
             ingredients=ingredients
         )
+        schedule_image_processing(recipe.id)
         return recipe
 
+    def update_ingredients_amount(self, recipe, ingredients):
+        amounts = {
+            ingredient['id']: ingredient['amount']
+            for ingredient in ingredients
+        }
+        old_amounts = {}
+        changed, removed = [], []
+        for row in recipe.ingredientsrecipes.all():
+            amount = amounts.get(row.ingredient_id)
+            if amount is None or row.ingredient_id in old_amounts:
+                removed.append(row.id)
+                continue
+            old_amounts[row.ingredient_id] = row.amount
+            if row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if changed:
+            IngredientsRecipes.objects.bulk_update(changed, ['amount'])
+        if removed:
+            removed_rows = IngredientsRecipes.objects.filter(id__in=removed)
+            removed_rows.version_bumped = True
+            removed_rows.delete()
+        IngredientsRecipes.objects.bulk_create([
+            IngredientsRecipes(
+                ingredient_id=ingredient_id,
+                recipe=recipe,
+                amount=amount
+            )
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in old_amounts
+        ])
+        # Удалённые строки вычитаются из корзин сигналом pre_delete,
+        # массовые изменения и добавления сигналов не отправляют.
+        CartsIngredients.objects.apply(
+            recipe.carts.values_list('user_id', flat=True),
+            {
+                ingredient_id: amount - old_amounts.get(ingredient_id, 0)
+                for ingredient_id, amount in amounts.items()
+            }
+        )
+
     @atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop('tags')
-        ingredients = validated_data.pop('ingredients')
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients_amount(
-            recipe=instance,
-            ingredients=ingredients
-        )
+        # Версию рецепта увеличит его сохранение в конце.
+        mark_version_bumped(instance)
+        tags = validated_data.pop('tags', None)
+        ingredients = validated_data.pop('ingredients', None)
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients_amount(
+                recipe=instance,
+                ingredients=ingredients
+            )
+        if 'image' in validated_data:
+            validated_data['thumbnail'] = ''
+            schedule_image_processing(instance.id)
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects([instance], *recipe_prefetches())
         serializer = RecipeSerializer(
             instance,
             context={'request': self.context.get('request')}
@@ -287,7 +398,7 @@ class RecipeAddSerializer(ModelSerializer):
 
 
 class RecipesShortSerializer(ModelSerializer):
-    image = base64
+    image = ImageField(source='preview', read_only=True)
 
     class Meta:
         model = Recipes
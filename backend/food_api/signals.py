@@ -0,0 +1,291 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models import F, QuerySet, Sum
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save
+)
+from django.db.transaction import on_commit
+from django.dispatch import receiver
+
+from food_api.cache import (
+    ingredients_cache,
+    recipes_list_cache,
+    tags_cache
+)
+from recipes.models import (
+    Carts,
+    CartsIngredients,
+    Feeds,
+    Ingredients,
+    IngredientsRecipes,
+    Recipes,
+    Tags
+)
+
+User = get_user_model()
+
+
+def casefold(value):
+    return None if value is None else value.casefold()
+
+
+@receiver(connection_created)
+def register_sqlite_casefold(connection, **kwargs):
+    """Функция casefold для поиска на SQLite.
+
+    LIKE в SQLite не различает регистр только у латиницы, поэтому
+    поиск по русским названиям сравнивает строки после casefold.
+    """
+    if connection.vendor == 'sqlite':
+        connection.connection.create_function(
+            'casefold',
+            1,
+            casefold,
+            deterministic=True
+        )
+
+
+@receiver((post_save, post_delete), sender=Tags)
+def invalidate_tags_cache(**kwargs):
+    on_commit(tags_cache.invalidate)
+
+
+@receiver((post_save, post_delete), sender=Ingredients)
+def invalidate_ingredients_cache(**kwargs):
+    on_commit(ingredients_cache.invalidate)
+
+
+@receiver(post_save, sender=Recipes)
+def update_recipe_search_vector(instance, **kwargs):
+    on_commit(lambda: Recipes.objects.update_search_vector([instance.id]))
+
+
+@receiver(post_save, sender=Recipes)
+def fan_out_recipe(instance, created, **kwargs):
+    if created and instance.author_id:
+        on_commit(
+            lambda: Feeds.objects.fan_out(instance.id, instance.author_id)
+        )
+
+
+@receiver(post_save, sender=Ingredients)
+def update_ingredient_recipes_search_vector(instance, created, **kwargs):
+    if created:
+        return
+    recipe_ids = IngredientsRecipes.objects.filter(
+        ingredient=instance
+    ).values('recipe_id')
+    on_commit(lambda: Recipes.objects.update_search_vector(recipe_ids))
+
+
+@receiver((post_save, post_delete), sender=Recipes)
+@receiver((post_save, post_delete), sender=IngredientsRecipes)
+@receiver((post_save, post_delete), sender=Ingredients)
+@receiver((post_save, post_delete), sender=Tags)
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def invalidate_recipes_list_cache(**kwargs):
+    on_commit(recipes_list_cache.invalidate)
+
+
+def mark_version_bumped(recipe):
+    """Версия рецепта уже увеличивается в текущей транзакции.
+
+    Отметка снимается после коммита, а до него изменения тегов и
+    ингредиентов этого рецепта не увеличивают версию ещё раз.
+    """
+    recipe.version_bumped = True
+    on_commit(lambda: vars(recipe).pop('version_bumped', None))
+
+
+@receiver(pre_save, sender=Recipes)
+def bump_recipe_version(instance, update_fields, **kwargs):
+    # Новый рецепт ещё не закэширован, у сохраняемого версия растёт в
+    # том же UPDATE.
+    if not instance._state.adding:
+        if update_fields is not None and 'version' not in update_fields:
+            return
+        instance.version = F('version') + 1
+    mark_version_bumped(instance)
+
+
+@receiver(post_save, sender=Recipes)
+def bump_recipe_version_after_save(instance, created, update_fields,
+                                   **kwargs):
+    if hasattr(instance.version, 'resolve_expression'):
+        # Новое значение версии загрузится из базы при обращении.
+        vars(instance).pop('version')
+    elif not created and update_fields is not None:
+        Recipes.objects.bump_versions([instance.id])
+
+
+@receiver(m2m_changed, sender=Recipes.tags.through)
+def bump_recipe_version_on_tags(instance, action, reverse, pk_set,
+                                **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear') and not (
+            getattr(instance, 'version_bumped', False)
+        ):
+            Recipes.objects.bump_versions([instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        Recipes.objects.bump_versions(pk_set)
+    elif action == 'pre_clear':
+        Recipes.objects.bump_versions(instance.recipes.values('id'))
+
+
+@receiver(post_save, sender=IngredientsRecipes)
+def bump_recipe_version_on_ingredient_save(instance, **kwargs):
+    recipe_ids = {instance.recipe_id}
+    if instance.stored_ingredient is not None:
+        recipe_ids.add(instance.stored_ingredient[0])
+    Recipes.objects.bump_versions(recipe_ids)
+
+
+@receiver(pre_delete, sender=IngredientsRecipes)
+def bump_recipe_version_on_ingredient_delete(instance, origin, **kwargs):
+    if deleted_with(origin, Recipes, Ingredients):
+        return
+    if not isinstance(origin, QuerySet):
+        Recipes.objects.bump_versions([instance.recipe_id])
+        return
+    # Запрос удаления помечается, если версию уже увеличит сохранение
+    # рецепта, иначе версии увеличиваются при первой строке запроса.
+    if getattr(origin, 'version_bumped', False):
+        return
+    origin.version_bumped = True
+    Recipes.objects.bump_versions(origin.values('recipe_id'))
+
+
+@receiver(post_save, sender=Tags)
+@receiver(pre_delete, sender=Tags)
+def bump_tag_recipes_versions(instance, created=False, **kwargs):
+    if not created:
+        Recipes.objects.bump_versions(instance.recipes.values('id'))
+
+
+@receiver(post_save, sender=Ingredients)
+@receiver(pre_delete, sender=Ingredients)
+def bump_ingredient_recipes_versions(instance, created=False, **kwargs):
+    if not created:
+        Recipes.objects.bump_versions(instance.recipes.values('id'))
+
+
+AUTHOR_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+
+@receiver(pre_save, sender=User)
+def check_author_changed(instance, update_fields, **kwargs):
+    """Изменились ли поля автора, которые попадают в список рецептов."""
+    instance.author_changed = False
+    if instance.pk is None:
+        return
+    fields = AUTHOR_FIELDS
+    if update_fields is not None:
+        fields = tuple(field for field in fields if field in update_fields)
+        if not fields:
+            return
+    stored = User.objects.filter(
+        pk=instance.pk,
+        recipes__isnull=False
+    ).values_list(*fields)[:1]
+    instance.author_changed = any(
+        values != tuple(getattr(instance, field) for field in fields)
+        for values in stored
+    )
+
+
+@receiver(post_save, sender=User)
+def invalidate_recipes_list_cache_for_author(instance, **kwargs):
+    if getattr(instance, 'author_changed', False):
+        on_commit(recipes_list_cache.invalidate)
+
+
+@receiver(pre_delete, sender=User)
+def check_author_deleted(instance, **kwargs):
+    instance.author_changed = instance.recipes.exists()
+
+
+@receiver(post_delete, sender=User)
+def invalidate_recipes_list_cache_for_deleted_author(instance, **kwargs):
+    if getattr(instance, 'author_changed', False):
+        on_commit(recipes_list_cache.invalidate)
+
+
+def deleted_with(origin, *models):
+    """Удаление начато с объекта или запроса одной из моделей."""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, models)
+
+
+@receiver(post_save, sender=Carts)
+def add_recipe_to_cart_ingredients(instance, created, **kwargs):
+    if created:
+        CartsIngredients.objects.add_recipe(
+            [instance.user_id],
+            instance.recipe_id
+        )
+
+
+@receiver(post_delete, sender=Carts)
+def remove_recipe_from_cart_ingredients(instance, origin, **kwargs):
+    # Корзины удаляемых рецептов обновляет remove_recipe_from_carts,
+    # строки удаляемых пользователей удаляются каскадно.
+    if not deleted_with(origin, Recipes, User):
+        CartsIngredients.objects.remove_recipe(
+            [instance.user_id],
+            instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=Recipes)
+def remove_recipe_from_carts(instance, **kwargs):
+    CartsIngredients.objects.remove_recipe(
+        instance.carts.values_list('user_id', flat=True),
+        instance.id
+    )
+
+
+@receiver(pre_save, sender=IngredientsRecipes)
+def remember_recipe_ingredient(instance, **kwargs):
+    instance.stored_ingredient = None
+    if instance.pk is not None:
+        instance.stored_ingredient = IngredientsRecipes.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe_id', 'ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=IngredientsRecipes)
+def apply_recipe_ingredient_to_carts(instance, **kwargs):
+    changes = [(instance.recipe_id, instance.ingredient_id, instance.amount)]
+    if instance.stored_ingredient is not None:
+        recipe_id, ingredient_id, amount = instance.stored_ingredient
+        changes.append((recipe_id, ingredient_id, -amount))
+    CartsIngredients.objects.apply_recipes(changes)
+
+
+@receiver(pre_delete, sender=IngredientsRecipes)
+def remove_recipe_ingredient_from_carts(instance, origin, **kwargs):
+    if deleted_with(origin, Recipes, Ingredients):
+        return
+    if not isinstance(origin, QuerySet):
+        CartsIngredients.objects.apply_recipes(
+            [(instance.recipe_id, instance.ingredient_id, -instance.amount)]
+        )
+        return
+    # Сигнал приходит для каждой строки, а весь запрос обрабатывается
+    # при первой из них.
+    if getattr(origin, 'carts_updated', False):
+        return
+    origin.carts_updated = True
+    CartsIngredients.objects.apply_recipes(
+        (recipe_id, ingredient_id, -amount)
+        for recipe_id, ingredient_id, amount in origin.values_list(
+            'recipe_id',
+            'ingredient_id'
+        ).annotate(
+            amount=Sum('amount')
+        ).values_list('recipe_id', 'ingredient_id', 'amount').order_by()
+    )
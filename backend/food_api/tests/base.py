@@ -0,0 +1,202 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import (
+    APIClient,
+    APITestCase,
+    APITransactionTestCase
+)
+
+from food_api.cache import ingredients_cache, tags_cache
+from recipes.models import (
+    Carts,
+    Favorites,
+    Feeds,
+    Ingredients,
+    IngredientsRecipes,
+    Recipes,
+    Tags
+)
+from users.models import Subscribe
+
+User = get_user_model()
+
+INGREDIENTS_PATH = settings.BASE_DIR.parent / 'data' / 'ingredients.json'
+PASSWORD = 'Gfhjkm-123456'
+
+
+def image_base64():
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'orange').save(buffer, 'PNG')
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{encoded}'
+
+
+class FoodgramTestMixin:
+    """Общие данные тестов API.
+
+    Ингредиенты загружаются из data/ingredients.json командой
+    ingredientadd, обработка изображений в фоне отключена.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def create_fixtures(cls):
+        call_command('ingredientadd', INGREDIENTS_PATH, stdout=StringIO())
+        cls.ingredients = list(Ingredients.objects.order_by('id')[:40])
+        cls.tags = [
+            Tags.objects.create(
+                name=f'Тег {number}',
+                color=f'#00000{number}',
+                slug=f'tag{number}'
+            )
+            for number in range(3)
+        ]
+        cls.user = cls.create_user('reader')
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        tags_cache.local.clear()
+        ingredients_cache.local.clear()
+        executor = mock.patch('recipes.images.executor')
+        executor.start()
+        self.addCleanup(executor.stop)
+
+    @classmethod
+    def create_user(cls, username):
+        return User.objects.create_user(
+            username=username,
+            email=f'{username}@example.com',
+            password=PASSWORD,
+            first_name=username.title(),
+            last_name='Тестов'
+        )
+
+    @classmethod
+    def create_recipe(cls, author, ingredients=None, tags=None, name='Борщ'):
+        recipe = Recipes.objects.create(
+            author=author,
+            name=name,
+            text='Описание рецепта',
+            image='recipes/images/recipe.png',
+            cooking_time=10
+        )
+        recipe.tags.set(cls.tags[:1] if tags is None else tags)
+        IngredientsRecipes.objects.bulk_create(
+            IngredientsRecipes(recipe=recipe, ingredient=ingredient, amount=5)
+            for ingredient in (
+                cls.ingredients[:3] if ingredients is None else ingredients
+            )
+        )
+        return recipe
+
+    @classmethod
+    def subscribe(cls, user, authors):
+        Subscribe.objects.bulk_create(
+            Subscribe(user=user, author=author) for author in authors
+        )
+
+    @classmethod
+    def favorite(cls, user, recipes):
+        Favorites.objects.bulk_create(
+            Favorites(user=user, recipe=recipe) for recipe in recipes
+        )
+
+    @classmethod
+    def add_to_cart(cls, user, recipes):
+        Carts.objects.bulk_create(
+            Carts(user=user, recipe=recipe) for recipe in recipes
+        )
+
+    @classmethod
+    def rebuild(cls):
+        call_command('counterrebuild', stdout=StringIO())
+        call_command('cartrebuild', stdout=StringIO())
+        Feeds.objects.rebuild()
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        return client
+
+    def ingredients_data(self, ingredients, amount=10):
+        return [
+            {'id': ingredient.id, 'amount': amount}
+            for ingredient in ingredients
+        ]
+
+    def recipe_data(self, ingredients=None, tags=None):
+        return {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 15,
+            'image': image_base64(),
+            'tags': [tag.id for tag in (tags or self.tags[:1])],
+            'ingredients': self.ingredients_data(
+                ingredients or self.ingredients[:3]
+            ),
+        }
+
+    def request(self, method, url, data=None, user=None, client=None,
+                **extra):
+        client = client or self.client_for(user)
+        response = getattr(client, method)(url, data, format='json', **extra)
+        if response.streaming:
+            response.streaming_content = [
+                b''.join(response.streaming_content)
+            ]
+        return response
+
+
+class FoodgramTestCase(FoodgramTestMixin, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.create_fixtures()
+
+    def count_queries(self, method, url, data=None, user=None, **extra):
+        """Запросы к базе за один запрос к API с холодным кэшем.
+
+        Учитываются и запросы из on_commit, которые в работающем
+        приложении выполняются до отправки ответа.
+        """
+        client = self.client_for(user)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.request(
+                    method, url, data, client=client, **extra
+                )
+        return response, len(queries)
+
+
+class FoodgramTransactionTestCase(FoodgramTestMixin, APITransactionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_fixtures()
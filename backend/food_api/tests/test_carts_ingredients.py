@@ -0,0 +1,153 @@
+from django.contrib.auth import get_user_model
+
+from food_api.tests.base import FoodgramTestCase
+from recipes.models import Carts, CartsIngredients, IngredientsRecipes
+
+User = get_user_model()
+
+
+class CartsIngredientsTest(FoodgramTestCase):
+    """Сводная корзина совпадает с корзинами при любых изменениях."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.buyer = cls.create_user('buyer')
+        cls.soup = cls.create_recipe(cls.author, cls.ingredients[:3])
+        cls.salad = cls.create_recipe(cls.author, cls.ingredients[2:5])
+        for user in (cls.user, cls.buyer):
+            Carts.objects.create(user=user, recipe=cls.soup)
+            Carts.objects.create(user=user, recipe=cls.salad)
+
+    def assertCartsIngredients(self):
+        self.assertEqual(
+            sorted(CartsIngredients.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )),
+            sorted(CartsIngredients.objects.live_totals())
+        )
+
+    def test_carts_created_through_orm(self):
+        self.assertCartsIngredients()
+        self.assertEqual(
+            CartsIngredients.objects.get(
+                user=self.user,
+                ingredient=self.ingredients[2]
+            ).amount,
+            10
+        )
+
+    def test_cart_deleted(self):
+        Carts.objects.get(user=self.user, recipe=self.soup).delete()
+        self.assertCartsIngredients()
+        Carts.objects.filter(user=self.buyer).delete()
+        self.assertCartsIngredients()
+
+    def test_recipe_deleted(self):
+        self.soup.delete()
+        self.assertCartsIngredients()
+
+    def test_user_deleted(self):
+        self.buyer.delete()
+        self.assertCartsIngredients()
+
+    def test_ingredient_deleted(self):
+        self.ingredients[2].delete()
+        self.assertCartsIngredients()
+
+    def test_recipe_ingredient_changed(self):
+        row = IngredientsRecipes.objects.get(
+            recipe=self.soup,
+            ingredient=self.ingredients[2]
+        )
+        row.amount = 12
+        row.save()
+        self.assertCartsIngredients()
+        row.ingredient = self.ingredients[10]
+        row.save()
+        self.assertCartsIngredients()
+        IngredientsRecipes.objects.create(
+            recipe=self.salad,
+            ingredient=self.ingredients[11],
+            amount=4
+        )
+        self.assertCartsIngredients()
+
+    def test_recipe_ingredient_deleted(self):
+        IngredientsRecipes.objects.filter(
+            recipe=self.soup,
+            ingredient=self.ingredients[0]
+        ).get().delete()
+        self.assertCartsIngredients()
+        IngredientsRecipes.objects.filter(
+            ingredient__in=self.ingredients[1:4]
+        ).delete()
+        self.assertCartsIngredients()
+
+    def test_recipe_updated_through_api(self):
+        data = self.recipe_data(self.ingredients[1:2] + self.ingredients[6:8])
+        response = self.request(
+            'put',
+            f'/api/recipes/{self.soup.id}/',
+            data,
+            self.author
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertCartsIngredients()
+
+    def test_shopping_cart_through_api(self):
+        response = self.request(
+            'delete',
+            f'/api/recipes/{self.soup.id}/shopping_cart/',
+            user=self.user
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertCartsIngredients()
+        response = self.request(
+            'post',
+            f'/api/recipes/{self.soup.id}/shopping_cart/',
+            user=self.user
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertCartsIngredients()
+        response = self.request(
+            'delete',
+            f'/api/recipes/{self.salad.id}/',
+            user=self.author
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertCartsIngredients()
+
+    def test_download_etag(self):
+        url = '/api/recipes/download_shopping_cart/'
+        etag = self.request('get', url, user=self.user)['ETag']
+
+        def download():
+            return self.request(
+                'get',
+                url,
+                user=self.user,
+                HTTP_IF_NONE_MATCH=etag
+            )
+
+        self.assertEqual(download().status_code, 304)
+        Carts.objects.create(
+            user=self.buyer,
+            recipe=self.create_recipe(self.author)
+        )
+        self.assertEqual(download().status_code, 304)
+        IngredientsRecipes.objects.filter(recipe=self.soup).update(amount=1)
+        CartsIngredients.objects.rebuild([self.user.id])
+        response = download()
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredients[0].name = 'Новое название'
+            self.ingredients[0].save()
+        response = download()
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'Новое название',
+            b''.join(response.streaming_content).decode()
+        )
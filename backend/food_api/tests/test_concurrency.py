@@ -0,0 +1,75 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import skipUnless
+
+from django.db import connection, connections
+
+from food_api.tests.base import FoodgramTransactionTestCase
+from recipes.models import Carts, Favorites, Feeds, Recipes
+from users.models import Subscribe
+
+THREADS = 8
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Concurrent writes need PostgreSQL.'
+)
+class ConcurrentRequestsTest(FoodgramTransactionTestCase):
+    """Одновременные одинаковые запросы создают одну запись."""
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+
+    def post_concurrently(self, url):
+        clients = [self.client_for(self.user) for _ in range(THREADS)]
+        barrier = Barrier(THREADS)
+
+        def post(client):
+            try:
+                barrier.wait()
+                return client.post(url).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(THREADS) as executor:
+            statuses = sorted(executor.map(post, clients))
+        self.assertEqual(statuses, [201] + [400] * (THREADS - 1))
+
+    def test_favorite(self):
+        self.post_concurrently(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(
+            Favorites.objects.filter(user=self.user).count(),
+            1
+        )
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+
+    def test_shopping_cart(self):
+        self.post_concurrently(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        )
+        self.assertEqual(Carts.objects.filter(user=self.user).count(), 1)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.carts_count, 1)
+        self.assertEqual(
+            sorted(self.user.carts_ingredients.values_list(
+                'ingredient_id',
+                'amount'
+            )),
+            sorted(self.recipe.ingredientsrecipes.values_list(
+                'ingredient_id',
+                'amount'
+            ))
+        )
+
+    def test_subscribe(self):
+        Recipes.objects.filter(id=self.recipe.id).update(in_feeds=True)
+        self.post_concurrently(f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(
+            Subscribe.objects.filter(user=self.user).count(),
+            1
+        )
+        self.assertEqual(Feeds.objects.filter(user=self.user).count(), 1)
@@ -0,0 +1,73 @@
+from food_api.tests.base import FoodgramTestCase
+from recipes.models import Feeds, Recipes
+
+
+class FeedTest(FoodgramTestCase):
+    """Лента подписок: разосланные рецепты и рецепты популярных авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.popular = cls.create_user('popular')
+        cls.stranger = cls.create_user('stranger')
+        for number in range(4):
+            for author in (cls.author, cls.popular, cls.stranger):
+                cls.create_recipe(
+                    author,
+                    tags=cls.tags[number % 2:number % 2 + 1],
+                    name=f'Рецепт {number}'
+                )
+        cls.subscribe(cls.user, [cls.author, cls.popular])
+        cls.rebuild()
+        Feeds.objects.filter(author=cls.popular).delete()
+        Recipes.objects.filter(author=cls.popular).update(in_feeds=False)
+        cls.feed_ids = list(
+            Recipes.objects.filter(
+                author__in=[cls.author, cls.popular]
+            ).order_by('-id').values_list('id', flat=True)
+        )
+
+    def get_ids(self, url):
+        response = self.request('get', url, user=self.user)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']], response
+
+    def test_pages_merge_feed_and_fallback(self):
+        ids, url = [], '/api/recipes/feed/?limit=3'
+        while url:
+            page, response = self.get_ids(url)
+            ids.extend(page)
+            url = response.data['next']
+        self.assertEqual(ids, self.feed_ids)
+
+    def test_previous_page(self):
+        first, response = self.get_ids('/api/recipes/feed/?limit=3')
+        self.assertIsNone(response.data['previous'])
+        second, response = self.get_ids(response.data['next'])
+        self.assertEqual(second, self.feed_ids[3:6])
+        previous, response = self.get_ids(response.data['previous'])
+        self.assertEqual(previous, first)
+        self.assertIsNone(response.data['previous'])
+        self.assertIsNotNone(response.data['next'])
+
+    def test_filters_apply_to_both_sources(self):
+        ids, _ = self.get_ids('/api/recipes/feed/?limit=20&tags=tag1')
+        self.assertEqual(
+            ids,
+            list(
+                Recipes.objects.filter(
+                    id__in=self.feed_ids,
+                    tags=self.tags[1]
+                ).order_by('-id').values_list('id', flat=True)
+            )
+        )
+        self.assertEqual(len(ids), 4)
+
+    def test_invalid_position(self):
+        response = self.request(
+            'get',
+            '/api/recipes/feed/?before=abc',
+            user=self.user
+        )
+        self.assertEqual(response.status_code, 404)
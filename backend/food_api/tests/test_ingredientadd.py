@@ -0,0 +1,47 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Ingredients
+
+
+class IngredientAddTest(TestCase):
+    """Загрузка ингредиентов командой ingredientadd."""
+
+    def write(self, name, content):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def call(self, path):
+        call_command('ingredientadd', path, stdout=StringIO())
+
+    def test_csv(self):
+        self.call(self.write('ingredients.csv', 'соль,г\n\nмука,кг\n'))
+        self.assertEqual(
+            set(Ingredients.objects.values_list(
+                'name',
+                'measurement_unit'
+            )),
+            {('соль', 'г'), ('мука', 'кг')}
+        )
+
+    def test_short_csv_row(self):
+        path = self.write('ingredients.csv', 'соль,г\nмука\n')
+        with self.assertRaisesMessage(CommandError, 'Line 2'):
+            self.call(path)
+        self.assertFalse(Ingredients.objects.exists())
+
+    def test_json_item_without_unit(self):
+        path = self.write('ingredients.json', '[{"name": "соль"}]')
+        with self.assertRaisesMessage(CommandError, 'Item 1'):
+            self.call(path)
+
+    def test_missing_file(self):
+        with self.assertRaisesMessage(CommandError, 'File not found'):
+            self.call(Path(tempfile.gettempdir()) / 'missing.csv')
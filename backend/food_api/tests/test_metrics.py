@@ -0,0 +1,83 @@
+import itertools
+import json
+import os
+from unittest import mock
+
+from django.test import override_settings
+
+from food_api.tests.base import FoodgramTestCase
+
+
+@override_settings(
+    METRICS_ENABLED=True,
+    METRICS_TOKEN='secret',
+    METRICS_SAMPLE_RATE=1
+)
+class MetricsTest(FoodgramTestCase):
+    """Метрики запросов и доступ к /api/metrics/."""
+
+    def setUp(self):
+        super().setUp()
+        logger = mock.patch('food_api.middleware.logger')
+        self.logger = logger.start()
+        self.addCleanup(logger.stop)
+
+    def test_metrics_require_token(self):
+        for authorization in (None, 'Bearer wrong', 'Token secret'):
+            extra = {}
+            if authorization is not None:
+                extra['HTTP_AUTHORIZATION'] = authorization
+            response = self.request('get', '/api/metrics/', **extra)
+            self.assertEqual(response.status_code, 401, authorization)
+            self.assertEqual(response['WWW-Authenticate'], 'Bearer')
+
+    @override_settings(METRICS_TOKEN='')
+    def test_metrics_disabled_without_token(self):
+        response = self.request(
+            'get',
+            '/api/metrics/',
+            HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_metrics_are_labelled_with_worker(self):
+        self.request('get', '/api/tags/')
+        response = self.request(
+            'get',
+            '/api/metrics/',
+            HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            f'foodgram_request_duration_seconds_count{{'
+            f'worker="{os.getpid()}",view="food_api.views.tags_list"}}',
+            response.content.decode()
+        )
+
+    def test_server_timing_separates_encoding(self):
+        response = self.request('get', '/api/tags/')
+        entries = [
+            entry.split(';')[0]
+            for entry in response['Server-Timing'].split(', ')
+        ]
+        self.assertEqual(
+            entries,
+            ['db', 'app', 'serialize', 'encode', 'total']
+        )
+        self.assertIn('encode;desc="renderer only"', response['Server-Timing'])
+
+    def test_serializer_time_is_recorded(self):
+        author = self.create_user('author')
+        self.create_recipe(author)
+        with mock.patch(
+            'food_api.middleware.time.perf_counter',
+            side_effect=itertools.count()
+        ):
+            response = self.request('get', '/api/recipes/')
+        timings = {
+            entry.split(';')[0]: float(entry.rsplit('dur=', 1)[1])
+            for entry in response['Server-Timing'].split(', ')
+        }
+        self.assertGreater(timings['serialize'], 0)
+        record = json.loads(self.logger.info.call_args.args[0])
+        self.assertEqual(record['serialize_ms'], timings['serialize'])
@@ -0,0 +1,64 @@
+from food_api.tests.base import FoodgramTestCase
+from recipes.models import Recipes
+
+
+class RecipesPaginationTest(FoodgramTestCase):
+    """Курсорная пагинация не отменяет порядок поиска и ?ordering=."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        author = cls.create_user('author')
+        cls.recipes = [
+            cls.create_recipe(author, name=name)
+            for name in ('Суп', 'Борщ', 'Борщ с борщом', 'Каша')
+        ]
+        Recipes.objects.update_search_vector(
+            [recipe.id for recipe in cls.recipes]
+        )
+
+    def get(self, url):
+        return self.request('get', url, user=self.user)
+
+    def test_cursor_pages_in_id_order(self):
+        response = self.get('/api/recipes/?cursor=&limit=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [recipe.id for recipe in self.recipes[::-1][:2]]
+        )
+        self.assertIn('cursor=', response.data['next'])
+
+    def test_cursor_with_search_is_rejected(self):
+        response = self.get('/api/recipes/?search=борщ&cursor=')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_cursor_with_ordering_is_rejected(self):
+        response = self.get('/api/recipes/?ordering=favorites_count&cursor=')
+        self.assertEqual(response.status_code, 400)
+
+    def test_search_pages_keep_rank_order(self):
+        response = self.get('/api/recipes/?search=борщ&page=1&limit=10')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[2].id, self.recipes[1].id]
+        )
+
+    def test_ordering_breaks_ties_by_id(self):
+        self.favorite(self.user, self.recipes[1:2])
+        self.rebuild()
+        ids = []
+        for page in (1, 2):
+            response = self.get(
+                f'/api/recipes/?ordering=-favorites_count&page={page}&limit=2'
+            )
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(ids, [
+            self.recipes[1].id,
+            self.recipes[3].id,
+            self.recipes[2].id,
+            self.recipes[0].id,
+        ])
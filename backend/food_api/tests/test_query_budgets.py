@@ -0,0 +1,522 @@
+from django.conf import settings
+from django.test import override_settings
+from django.urls import URLResolver
+
+from food_api import urls
+from food_api.tests.base import PASSWORD, FoodgramTestCase
+
+PAGE_SIZES = (2, 20)
+
+# Число запросов к базе на запрос к API с холодным кэшем, включая
+# поиск токена и SAVEPOINT атомарных блоков внутри теста.
+QUERY_BUDGETS = {
+    ('get', 'APIRootView'): 0,
+    ('get', 'RecipesViewSet.download_shopping_cart'): 2,
+    ('get', 'RecipesViewSet.feed'): 5,
+    ('get', 'RecipesViewSet.list'): 6,
+    ('get', 'RecipesViewSet.retrieve'): 5,
+    ('post', 'RecipesViewSet.create'): 19,
+    ('put', 'RecipesViewSet.update'): 31,
+    ('patch', 'RecipesViewSet.partial_update'): 31,
+    ('delete', 'RecipesViewSet.destroy'): 18,
+    ('post', 'RecipesViewSet.favorite'): 6,
+    ('delete', 'RecipesViewSet.del_favorite'): 5,
+    ('post', 'RecipesViewSet.shopping_cart'): 10,
+    ('delete', 'RecipesViewSet.del_shopping_cart'): 10,
+    ('post', 'TokenCreateView'): 6,
+    ('post', 'TokenDestroyView'): 2,
+    ('get', 'UserViewSet.list'): 3,
+    ('post', 'UserViewSet.create'): 5,
+    ('get', 'UserViewSet.retrieve'): 2,
+    ('put', 'UserViewSet.update'): 6,
+    ('patch', 'UserViewSet.partial_update'): 6,
+    ('delete', 'UserViewSet.destroy'): 15,
+    ('get', 'UserViewSet.me'): 1,
+    ('put', 'UserViewSet.me'): 5,
+    ('patch', 'UserViewSet.me'): 5,
+    ('delete', 'UserViewSet.me'): 14,
+    ('post', 'UserViewSet.activation'): 0,
+    ('post', 'UserViewSet.resend_activation'): 1,
+    ('post', 'UserViewSet.reset_password'): 1,
+    ('post', 'UserViewSet.reset_password_confirm'): 0,
+    ('post', 'UserViewSet.reset_username'): 1,
+    ('post', 'UserViewSet.reset_username_confirm'): 1,
+    ('post', 'UserViewSet.set_password'): 3,
+    ('post', 'UserViewSet.set_username'): 4,
+    ('get', 'UserViewSet.subscriptions'): 4,
+    ('post', 'UserViewSet.subscribe'): 8,
+    ('delete', 'UserViewSet.unsubscribe'): 5,
+    ('get', 'ingredients_detail'): 1,
+    ('get', 'ingredients_list'): 1,
+    ('get', 'metrics'): 0,
+    ('get', 'tags_detail'): 1,
+    ('get', 'tags_list'): 1,
+}
+
+
+def route_views(patterns):
+    """Пары (метод, представление) маршрутов, HEAD и OPTIONS не в счёт."""
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from route_views(pattern.url_patterns)
+            continue
+        callback = pattern.callback
+        view_class = getattr(callback, 'cls', None)
+        actions = getattr(callback, 'actions', None)
+        if actions:
+            views = (
+                (method, f'{view_class.__name__}.{action}')
+                for method, action in actions.items()
+            )
+        elif view_class is not None:
+            views = (
+                (method, view_class.__name__)
+                for method in view_class.http_method_names
+                if hasattr(view_class, method)
+            )
+        else:
+            views = (('get', callback.__name__),)
+        for method, view in views:
+            if method not in ('head', 'options'):
+                yield method, view
+
+
+def describe(response):
+    if response.streaming:
+        return ''
+    return response.content[:500]
+
+
+class QueryBudgetsTest(FoodgramTestCase):
+    """Число SQL-запросов каждого маршрута API.
+
+    Число запросов не должно зависеть от размера страницы, числа
+    ингредиентов рецепта и числа подписчиков автора.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.authors = [
+            cls.create_user(f'author{number}') for number in range(20)
+        ]
+        cls.recipes = [
+            cls.create_recipe(author, tags=cls.tags[:2])
+            for author in cls.authors for _ in range(2)
+        ]
+        cls.other = cls.create_user('other')
+        cls.subscribe(cls.user, cls.authors)
+        cls.subscribe(cls.other, cls.authors[:2])
+        for follower in cls.authors[1:]:
+            cls.subscribe(follower, cls.authors[:1])
+        cls.favorite(cls.user, cls.recipes[:20])
+        cls.add_to_cart(cls.user, cls.recipes[:20])
+        cls.add_to_cart(cls.other, cls.recipes[:2])
+        cls.rebuild()
+
+    def assertQueries(self, method, view, count):
+        budget = QUERY_BUDGETS[(method, view)]
+        self.assertLessEqual(
+            count,
+            budget,
+            f'{method.upper()} {view} made {count} queries, '
+            f'the budget is {budget}.'
+        )
+
+    def assertSameQueries(self, method, view, requests):
+        """Запросы одного маршрута с малыми и большими данными."""
+        counts = []
+        for url, data, user, status in requests:
+            response, count = self.count_queries(method, url, data, user)
+            self.assertEqual(
+                response.status_code,
+                status,
+                f'{method.upper()} {url}: {describe(response)}'
+            )
+            counts.append(count)
+        self.assertEqual(
+            counts[0],
+            counts[-1],
+            f'{method.upper()} {view}: the number of queries depends on '
+            f'the size of the data.'
+        )
+        self.assertQueries(method, view, counts[-1])
+
+    def assertPageQueries(self, view, url, user=None):
+        self.assertSameQueries('get', view, [
+            (url.format(limit=size), None, user, 200)
+            for size in PAGE_SIZES
+        ])
+
+    def assertRequestQueries(self, method, view, url, data=None, user=None,
+                             status=200, **extra):
+        response, count = self.count_queries(
+            method, url, data, user, **extra
+        )
+        self.assertEqual(
+            response.status_code,
+            status,
+            f'{method.upper()} {url}: {describe(response)}'
+        )
+        self.assertQueries(method, view, count)
+
+    def test_every_route_has_budget(self):
+        routes = set(route_views(urls.urlpatterns))
+        self.assertEqual(routes - QUERY_BUDGETS.keys(), set())
+
+    def test_reference_routes(self):
+        ingredient = self.ingredients[0]
+        tag = self.tags[0]
+        self.assertRequestQueries('get', 'APIRootView', '/api/')
+        self.assertPageQueries(
+            'ingredients_list',
+            '/api/ingredients/?name=а&limit={limit}'
+        )
+        self.assertRequestQueries(
+            'get',
+            'ingredients_detail',
+            f'/api/ingredients/{ingredient.id}/'
+        )
+        self.assertRequestQueries('get', 'tags_list', '/api/tags/')
+        self.assertRequestQueries(
+            'get',
+            'tags_detail',
+            f'/api/tags/{tag.id}/'
+        )
+
+    @override_settings(
+        METRICS_ENABLED=True,
+        METRICS_TOKEN='secret',
+        METRICS_SAMPLE_RATE=0
+    )
+    def test_metrics(self):
+        self.assertRequestQueries(
+            'get',
+            'metrics',
+            '/api/metrics/',
+            HTTP_AUTHORIZATION='Bearer secret'
+        )
+
+    def test_recipes_list(self):
+        tags = '&'.join(f'tags={tag.slug}' for tag in self.tags)
+        for user in (None, self.user):
+            self.assertPageQueries(
+                'RecipesViewSet.list',
+                '/api/recipes/?limit={limit}',
+                user
+            )
+            self.assertPageQueries(
+                'RecipesViewSet.list',
+                f'/api/recipes/?limit={{limit}}&{tags}',
+                user
+            )
+            self.assertPageQueries(
+                'RecipesViewSet.list',
+                '/api/recipes/?limit={limit}&search=борщ',
+                user
+            )
+        self.assertPageQueries(
+            'RecipesViewSet.list',
+            '/api/recipes/?limit={limit}&is_favorited=1&is_in_shopping_cart=1',
+            self.user
+        )
+
+    def test_recipes_feed(self):
+        self.assertPageQueries(
+            'RecipesViewSet.feed',
+            '/api/recipes/feed/?limit={limit}',
+            self.user
+        )
+
+    def test_recipe_retrieve(self):
+        small = self.create_recipe(self.authors[0], self.ingredients[:1])
+        large = self.create_recipe(
+            self.authors[0],
+            self.ingredients[:20],
+            self.tags
+        )
+        for user in (None, self.user):
+            self.assertSameQueries('get', 'RecipesViewSet.retrieve', [
+                (f'/api/recipes/{recipe.id}/', None, user, 200)
+                for recipe in (small, large)
+            ])
+
+    def test_recipe_create(self):
+        self.subscribe(self.authors[1], [self.user])
+        self.assertSameQueries('post', 'RecipesViewSet.create', [
+            (
+                '/api/recipes/',
+                self.recipe_data(self.ingredients[:1]),
+                self.user,
+                201
+            ),
+            (
+                '/api/recipes/',
+                self.recipe_data(self.ingredients[:20], self.tags),
+                self.user,
+                201
+            ),
+        ])
+
+    def test_recipe_update(self):
+        ingredients, tags = self.ingredients, self.tags
+        small = self.create_recipe(self.user, ingredients[:2], tags[:1])
+        large = self.create_recipe(self.user, ingredients[:20], tags[:2])
+        self.add_to_cart(self.create_user('buyer'), [small])
+        self.add_to_cart(self.create_user('large_buyer'), [large])
+        self.rebuild()
+        # В каждом запросе часть ингредиентов и тегов меняется, часть
+        # удаляется и часть добавляется.
+        self.assertSameQueries('put', 'RecipesViewSet.update', [
+            (
+                f'/api/recipes/{small.id}/',
+                self.recipe_data(
+                    ingredients[:1] + ingredients[2:3],
+                    tags[1:2]
+                ),
+                self.user,
+                200
+            ),
+            (
+                f'/api/recipes/{large.id}/',
+                self.recipe_data(
+                    ingredients[:10] + ingredients[20:30],
+                    tags[1:3]
+                ),
+                self.user,
+                200
+            ),
+        ])
+        self.assertSameQueries('patch', 'RecipesViewSet.partial_update', [
+            (
+                f'/api/recipes/{small.id}/',
+                {
+                    'tags': [tags[0].id],
+                    'ingredients': self.ingredients_data(
+                        ingredients[:1] + ingredients[3:4],
+                        amount=7
+                    ),
+                },
+                self.user,
+                200
+            ),
+            (
+                f'/api/recipes/{large.id}/',
+                {
+                    'tags': [tags[0].id, tags[1].id],
+                    'ingredients': self.ingredients_data(
+                        ingredients[:10] + ingredients[30:40],
+                        amount=7
+                    ),
+                },
+                self.user,
+                200
+            ),
+        ])
+
+    def test_recipe_destroy(self):
+        small = self.create_recipe(self.user, self.ingredients[:1])
+        large = self.create_recipe(
+            self.user,
+            self.ingredients[:20],
+            self.tags
+        )
+        self.add_to_cart(self.create_user('buyer'), [small])
+        self.add_to_cart(self.create_user('large_buyer'), [large])
+        self.favorite(self.other, (small, large))
+        self.rebuild()
+        self.assertSameQueries('delete', 'RecipesViewSet.destroy', [
+            (f'/api/recipes/{recipe.id}/', None, self.user, 204)
+            for recipe in (small, large)
+        ])
+
+    def test_favorite_and_shopping_cart(self):
+        small = self.create_recipe(self.authors[0], self.ingredients[:1])
+        large = self.create_recipe(self.authors[0], self.ingredients[1:21])
+        buyer = self.create_user('buyer')
+        for action, view in (
+            ('favorite', 'RecipesViewSet.favorite'),
+            ('shopping_cart', 'RecipesViewSet.shopping_cart')
+        ):
+            self.assertSameQueries('post', view, [
+                (f'/api/recipes/{recipe.id}/{action}/', None, buyer, 201)
+                for recipe in (small, large)
+            ])
+        for action, view in (
+            ('favorite', 'RecipesViewSet.del_favorite'),
+            ('shopping_cart', 'RecipesViewSet.del_shopping_cart')
+        ):
+            self.assertSameQueries('delete', view, [
+                (f'/api/recipes/{recipe.id}/{action}/', None, buyer, 204)
+                for recipe in (small, large)
+            ])
+
+    def test_download_shopping_cart(self):
+        self.assertSameQueries(
+            'get',
+            'RecipesViewSet.download_shopping_cart',
+            [
+                ('/api/recipes/download_shopping_cart/', None, user, 200)
+                for user in (self.other, self.user)
+            ]
+        )
+
+    def test_users(self):
+        for user in (None, self.user):
+            self.assertPageQueries(
+                'UserViewSet.list',
+                '/api/users/?limit={limit}',
+                user
+            )
+            self.assertRequestQueries(
+                'get',
+                'UserViewSet.retrieve',
+                f'/api/users/{self.authors[0].id}/',
+                user=user
+            )
+        self.assertRequestQueries(
+            'get', 'UserViewSet.me', '/api/users/me/', user=self.user
+        )
+        self.assertRequestQueries(
+            'post',
+            'UserViewSet.create',
+            '/api/users/',
+            {
+                'email': 'new@example.com',
+                'username': 'new',
+                'first_name': 'Новый',
+                'last_name': 'Пользователь',
+                'password': PASSWORD,
+            },
+            status=201
+        )
+
+    def test_subscriptions(self):
+        self.assertSameQueries('get', 'UserViewSet.subscriptions', [
+            (
+                f'/api/users/subscriptions/?limit={size}&recipes_limit=1',
+                None,
+                user,
+                200
+            )
+            for size, user in ((2, self.other), (20, self.user))
+        ])
+
+    def test_subscribe(self):
+        small = self.create_user('small')
+        self.create_recipe(small)
+        self.rebuild()
+        self.assertSameQueries('post', 'UserViewSet.subscribe', [
+            (f'/api/users/{author.id}/subscribe/', None, self.other, 201)
+            for author in (small, self.authors[5])
+        ])
+        self.assertSameQueries('delete', 'UserViewSet.unsubscribe', [
+            (f'/api/users/{author.id}/subscribe/', None, self.other, 204)
+            for author in (small, self.authors[5])
+        ])
+
+    def test_account(self):
+        user = self.create_user('account')
+        profile = {
+            'email': 'account@example.com',
+            'username': 'account',
+            'first_name': 'Новое',
+            'last_name': 'Имя',
+        }
+        for method in ('put', 'patch'):
+            self.assertRequestQueries(
+                method,
+                'UserViewSet.me',
+                '/api/users/me/',
+                profile,
+                user
+            )
+        self.assertRequestQueries(
+            'put', 'UserViewSet.update', f'/api/users/{user.id}/',
+            profile, user
+        )
+        self.assertRequestQueries(
+            'patch', 'UserViewSet.partial_update', f'/api/users/{user.id}/',
+            profile, user
+        )
+        self.assertRequestQueries(
+            'post',
+            'UserViewSet.set_password',
+            '/api/users/set_password/',
+            {'current_password': PASSWORD, 'new_password': f'{PASSWORD}!'},
+            user,
+            status=204
+        )
+        self.assertRequestQueries(
+            'post',
+            'UserViewSet.set_username',
+            '/api/users/set_email/',
+            {'current_password': f'{PASSWORD}!', 'new_email': 'a@example.com'},
+            user,
+            status=204
+        )
+        for username in ('me', 'destroy'):
+            author = self.create_user(username)
+            self.create_recipe(author, self.ingredients[:20])
+            self.subscribe(self.user, [author])
+            url = f'/api/users/{author.id}/'
+            view = 'UserViewSet.destroy'
+            if username == 'me':
+                url = '/api/users/me/'
+                view = 'UserViewSet.me'
+            self.assertRequestQueries(
+                'delete',
+                view,
+                url,
+                {'current_password': PASSWORD},
+                author,
+                status=204
+            )
+
+    @override_settings(DJOSER={
+        **settings.DJOSER,
+        'PASSWORD_RESET_CONFIRM_URL': 'password/reset/{uid}/{token}',
+        'USERNAME_RESET_CONFIRM_URL': 'email/reset/{uid}/{token}',
+    })
+    def test_account_emails(self):
+        email = {'email': self.other.email}
+        for action, view, data, status in (
+            ('activation', 'activation', {'uid': 'x', 'token': 'x'}, 400),
+            ('resend_activation', 'resend_activation', email, 400),
+            ('reset_password', 'reset_password', email, 204),
+            (
+                'reset_password_confirm',
+                'reset_password_confirm',
+                {'uid': 'x', 'token': 'x', 'new_password': PASSWORD},
+                400
+            ),
+            ('reset_email', 'reset_username', email, 204),
+            (
+                'reset_email_confirm',
+                'reset_username_confirm',
+                {'uid': 'x', 'token': 'x', 'new_email': 'a@example.com'},
+                400
+            ),
+        ):
+            self.assertRequestQueries(
+                'post',
+                f'UserViewSet.{view}',
+                f'/api/users/{action}/',
+                data,
+                status=status
+            )
+
+    def test_token(self):
+        self.assertRequestQueries(
+            'post',
+            'TokenCreateView',
+            '/api/auth/token/login/',
+            {'email': self.other.email, 'password': PASSWORD}
+        )
+        self.assertRequestQueries(
+            'post',
+            'TokenDestroyView',
+            '/api/auth/token/logout/',
+            user=self.other,
+            status=204
+        )
@@ -0,0 +1,62 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from food_api.tests.base import FoodgramTestCase
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Query plans are checked on PostgreSQL.'
+)
+class QueryPlansTest(FoodgramTestCase):
+    """Запросы списка рецептов используют индексы.
+
+    В маленькой тестовой базе планировщику дешевле читать таблицы целиком,
+    поэтому последовательное чтение запрещается: если подходящего индекса
+    нет, в плане всё равно останется Seq Scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        recipes = [cls.create_recipe(cls.author) for _ in range(10)]
+        cls.subscribe(cls.user, [cls.author])
+        cls.favorite(cls.user, recipes[::2])
+        cls.add_to_cart(cls.user, recipes[::3])
+
+    def assertIndexScans(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.request('get', url, user=self.user)
+        self.assertEqual(response.status_code, 200)
+        selects = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT')
+            and 'recipes_recipes' in query['sql']
+        ]
+        self.assertTrue(selects)
+        with connection.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+            try:
+                for sql in selects:
+                    cursor.execute(f'EXPLAIN {sql}')
+                    plan = '\n'.join(row[0] for row in cursor.fetchall())
+                    self.assertNotIn('Seq Scan', plan, f'{sql}\n{plan}')
+            finally:
+                cursor.execute('RESET enable_seqscan')
+
+    def test_recipes_list(self):
+        self.assertIndexScans('/api/recipes/')
+
+    def test_favorites_and_cart_filters(self):
+        self.assertIndexScans(
+            '/api/recipes/?is_favorited=1&is_in_shopping_cart=1'
+        )
+
+    def test_author_recipes(self):
+        self.assertIndexScans(f'/api/recipes/?author={self.author.id}')
+
+    def test_feed(self):
+        self.assertIndexScans('/api/recipes/feed/')
@@ -0,0 +1,45 @@
+from food_api.tests.base import FoodgramTestCase
+
+
+class RecipeFiltersTest(FoodgramTestCase):
+    """Фильтры списка рецептов не размножают строки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.recipe = cls.create_recipe(cls.author, tags=cls.tags)
+        cls.other_recipes = [
+            cls.create_recipe(cls.author, tags=cls.tags[:1])
+            for _ in range(2)
+        ]
+        cls.create_recipe(cls.author, tags=[])
+        recipes = [cls.recipe, *cls.other_recipes]
+        cls.favorite(cls.user, recipes)
+        cls.add_to_cart(cls.user, recipes)
+
+    def get_ids(self, query):
+        response = self.request(
+            'get',
+            f'/api/recipes/?limit=100&{query}',
+            user=self.user
+        )
+        self.assertEqual(response.status_code, 200)
+        ids = [recipe['id'] for recipe in response.data['results']]
+        self.assertEqual(response.data['count'], len(ids))
+        return ids
+
+    def test_recipe_with_several_selected_tags_is_listed_once(self):
+        tags = '&'.join(f'tags={tag.slug}' for tag in self.tags)
+        for query in (
+            tags,
+            f'{tags}&is_favorited=1',
+            f'{tags}&is_favorited=1&is_in_shopping_cart=1',
+        ):
+            ids = self.get_ids(query)
+            self.assertEqual(ids.count(self.recipe.id), 1)
+            self.assertEqual(len(ids), 3)
+
+    def test_tags_filter_matches_any_tag(self):
+        ids = self.get_ids(f'tags={self.tags[2].slug}')
+        self.assertEqual(ids, [self.recipe.id])
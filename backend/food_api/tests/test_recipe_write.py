@@ -0,0 +1,94 @@
+import json
+from unittest import mock
+
+from django.test import override_settings
+
+from food_api.tests.base import FoodgramTestCase
+from recipes.models import Recipes
+
+
+class RecipeWriteTest(FoodgramTestCase):
+    """Создание и изменение рецепта с ингредиентами."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.recipe = cls.create_recipe(cls.user, cls.ingredients[:3])
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        counts = []
+        for ingredients in (self.ingredients[:1], self.ingredients[:30]):
+            response, queries = self.count_queries(
+                'post',
+                '/api/recipes/',
+                self.recipe_data(ingredients),
+                self.user
+            )
+            self.assertEqual(response.status_code, 201, response.content)
+            self.assertEqual(
+                len(response.data['ingredients']),
+                len(ingredients)
+            )
+            counts.append(queries)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        ingredients = self.ingredients
+        small = self.create_recipe(self.user, ingredients[:2])
+        large = self.create_recipe(self.user, ingredients[:20])
+        counts = []
+        # Часть ингредиентов меняется, часть удаляется и часть добавляется.
+        for recipe, data in (
+            (small, ingredients[:1] + ingredients[2:3]),
+            (large, ingredients[:10] + ingredients[20:30]),
+        ):
+            response, queries = self.count_queries(
+                'put',
+                f'/api/recipes/{recipe.id}/',
+                self.recipe_data(data),
+                self.user
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(
+                {item['id'] for item in response.data['ingredients']},
+                {ingredient.id for ingredient in data}
+            )
+            counts.append(queries)
+        self.assertEqual(counts[0], counts[1])
+
+    def test_create_with_missing_ingredient(self):
+        data = self.recipe_data(self.ingredients[:1])
+        data['ingredients'].append({'id': 10 ** 9, 'amount': 1})
+        response = self.request('post', '/api/recipes/', data, self.user)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ingredients', response.data)
+        self.assertEqual(Recipes.objects.count(), 1)
+
+    def test_update_with_missing_ingredient(self):
+        data = self.recipe_data(self.ingredients[5:6])
+        data['ingredients'].append({'id': 10 ** 9, 'amount': 1})
+        response = self.request(
+            'put',
+            f'/api/recipes/{self.recipe.id}/',
+            data,
+            self.user
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            set(self.recipe.ingredients.all()),
+            set(self.ingredients[:3])
+        )
+
+    @override_settings(MAX_IMAGE_UPLOAD_SIZE=1024)
+    def test_oversized_body_is_rejected_before_parsing(self):
+        data = self.recipe_data()
+        data['text'] = 'а' * 512 * 1024
+        with mock.patch('rest_framework.parsers.JSONParser.parse') as parse:
+            response = self.client_for(self.user).post(
+                '/api/recipes/',
+                json.dumps(data),
+                content_type='application/json'
+            )
+        self.assertEqual(response.status_code, 413)
+        parse.assert_not_called()
+        self.assertEqual(Recipes.objects.count(), 1)
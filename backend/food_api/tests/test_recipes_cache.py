@@ -0,0 +1,172 @@
+from unittest import mock
+
+from food_api.cache import recipes_list_cache
+from food_api.serializers import RecipeListSerializer
+from food_api.tests.base import PASSWORD, FoodgramTestCase
+
+
+class RecipesListCacheTest(FoodgramTestCase):
+    """Сброс кэша списка рецептов при изменении пользователей."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.create_recipe(cls.author)
+
+    def assertInvalidated(self, action, invalidated=True):
+        version = recipes_list_cache.get_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        self.assertEqual(
+            recipes_list_cache.get_version() != version,
+            invalidated
+        )
+
+    def test_signup_keeps_cache(self):
+        self.assertInvalidated(
+            lambda: self.request('post', '/api/users/', {
+                'email': 'new@example.com',
+                'username': 'new',
+                'first_name': 'Новый',
+                'last_name': 'Пользователь',
+                'password': PASSWORD,
+            }),
+            invalidated=False
+        )
+
+    def test_password_change_keeps_cache(self):
+        self.assertInvalidated(
+            lambda: self.request(
+                'post',
+                '/api/users/set_password/',
+                {'current_password': PASSWORD, 'new_password': f'{PASSWORD}!'},
+                self.author
+            ),
+            invalidated=False
+        )
+
+    def test_login_keeps_cache(self):
+        self.assertInvalidated(
+            lambda: self.request('post', '/api/auth/token/login/', {
+                'email': self.author.email,
+                'password': PASSWORD,
+            }),
+            invalidated=False
+        )
+
+    def test_profile_change_of_user_without_recipes_keeps_cache(self):
+        self.assertInvalidated(
+            lambda: self.request(
+                'patch',
+                '/api/users/me/',
+                {'first_name': 'Читатель'},
+                self.user
+            ),
+            invalidated=False
+        )
+
+    def test_same_author_name_keeps_cache(self):
+        self.assertInvalidated(
+            lambda: self.request(
+                'patch',
+                '/api/users/me/',
+                {'first_name': self.author.first_name},
+                self.author
+            ),
+            invalidated=False
+        )
+
+    def test_author_name_change_invalidates_cache(self):
+        self.assertInvalidated(
+            lambda: self.request(
+                'patch',
+                '/api/users/me/',
+                {'first_name': 'Шеф'},
+                self.author
+            )
+        )
+
+    def test_user_deletion(self):
+        self.assertInvalidated(self.user.delete, invalidated=False)
+        self.assertInvalidated(self.author.delete)
+
+
+class RecipeRepresentationCacheTest(FoodgramTestCase):
+    """Кэш представлений рецептов сбрасывается для изменённых рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = cls.create_user('author')
+        cls.other = cls.create_user('other')
+        cls.recipe = cls.create_recipe(cls.author, tags=cls.tags[:1])
+        cls.others = [
+            cls.create_recipe(cls.other, tags=cls.tags[1:2], name=name)
+            for name in ('Суп', 'Каша')
+        ]
+
+    def list_recipes(self):
+        """Список рецептов и id заново сериализованных рецептов."""
+        with mock.patch.object(
+            RecipeListSerializer,
+            'to_representation',
+            autospec=True,
+            side_effect=RecipeListSerializer.to_representation
+        ) as to_representation:
+            response = self.request('get', '/api/recipes/', user=self.user)
+        self.assertEqual(response.status_code, 200)
+        serialized = {call.args[1].id for call in to_representation.mock_calls}
+        return {
+            recipe['id']: recipe for recipe in response.data['results']
+        }, serialized
+
+    def change(self, action):
+        self.list_recipes()
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+        return self.list_recipes()
+
+    def test_recipe_update_rebuilds_only_this_recipe(self):
+        recipes, serialized = self.change(
+            lambda: self.request(
+                'patch',
+                f'/api/recipes/{self.recipe.id}/',
+                {'name': 'Новый борщ'},
+                self.author
+            )
+        )
+        self.assertEqual(serialized, {self.recipe.id})
+        self.assertEqual(recipes[self.recipe.id]['name'], 'Новый борщ')
+
+    def test_tag_rename(self):
+        def rename():
+            self.tags[0].name = 'Обед'
+            self.tags[0].save()
+
+        recipes, serialized = self.change(rename)
+        self.assertEqual(serialized, {self.recipe.id})
+        self.assertEqual(recipes[self.recipe.id]['tags'][0]['name'], 'Обед')
+
+    def test_tag_removed_from_recipe(self):
+        recipes, serialized = self.change(
+            lambda: self.tags[1].recipes.remove(self.others[0])
+        )
+        self.assertEqual(serialized, {self.others[0].id})
+        self.assertEqual(recipes[self.others[0].id]['tags'], [])
+
+    def test_author_name_change(self):
+        recipes, serialized = self.change(
+            lambda: self.request(
+                'patch',
+                '/api/users/me/',
+                {'first_name': 'Шеф'},
+                self.other
+            )
+        )
+        self.assertEqual(serialized, {recipe.id for recipe in self.others})
+        for recipe in self.others:
+            self.assertEqual(
+                recipes[recipe.id]['author']['first_name'],
+                'Шеф'
+            )
@@ -0,0 +1,63 @@
+from food_api.tests.base import FoodgramTestCase
+
+PAGE_SIZES = (1, 100)
+
+
+class RecipesListQueriesTest(FoodgramTestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.authors = authors = [
+            cls.create_user(f'author{number}') for number in range(5)
+        ]
+        cls.recipes = [
+            cls.create_recipe(
+                authors[number % 5],
+                cls.ingredients[number % 30:number % 30 + 5],
+                cls.tags[:number % 3 + 1]
+            )
+            for number in range(100)
+        ]
+        cls.subscribe(cls.user, authors[:2])
+        cls.favorite(cls.user, cls.recipes[::3])
+        cls.add_to_cart(cls.user, cls.recipes[::4])
+
+    def get_page(self, size, user=None):
+        response, queries = self.count_queries(
+            'get',
+            f'/api/recipes/?limit={size}',
+            user=user
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), size)
+        return response.data['results'], queries
+
+    def assertPageQueries(self, user=None):
+        counts = [self.get_page(size, user)[1] for size in PAGE_SIZES]
+        self.assertEqual(counts[0], counts[1])
+
+    def test_anonymous(self):
+        self.assertPageQueries()
+
+    def test_authenticated(self):
+        self.assertPageQueries(self.user)
+
+    def test_page_content(self):
+        recipes, _ = self.get_page(100, self.user)
+        favorited = {recipe.id for recipe in self.recipes[::3]}
+        in_cart = {recipe.id for recipe in self.recipes[::4]}
+        followed = {author.id for author in self.authors[:2]}
+        for recipe in recipes:
+            self.assertEqual(recipe['is_favorited'], recipe['id'] in favorited)
+            self.assertEqual(
+                recipe['is_in_shopping_cart'],
+                recipe['id'] in in_cart
+            )
+            self.assertEqual(
+                recipe['author']['is_subscribed'],
+                recipe['author']['id'] in followed
+            )
+            self.assertEqual(len(recipe['ingredients']), 5)
+            self.assertTrue(recipe['tags'])
@@ -0,0 +1,50 @@
+from asgiref.sync import iscoroutinefunction
+from django.urls import resolve
+
+from food_api.tests.base import FoodgramTestCase
+
+
+class ReferencesTest(FoodgramTestCase):
+    """Асинхронные представления тегов и ингредиентов."""
+
+    def test_views_are_async(self):
+        for url in ('/api/tags/', '/api/tags/1/', '/api/ingredients/',
+                    '/api/ingredients/1/'):
+            self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+
+    def test_tags(self):
+        response = self.request('get', '/api/tags/')
+        self.assertEqual(response.status_code, 200)
+        self.assertCountEqual(response.json(), [
+            {
+                'id': tag.id,
+                'name': tag.name,
+                'color': tag.color,
+                'slug': tag.slug,
+            }
+            for tag in self.tags
+        ])
+        response = self.request(
+            'get',
+            '/api/tags/',
+            HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_ingredient_search(self):
+        response = self.request('get', '/api/ingredients/?name=Соль&limit=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+        self.assertTrue(
+            response.json()[0]['name'].casefold().startswith('соль')
+        )
+
+    def test_missing_item(self):
+        for url in ('/api/tags/0/', '/api/ingredients/abc/'):
+            response = self.request('get', url)
+            self.assertEqual(response.status_code, 404, url)
+            self.assertEqual(response.json(), {'detail': 'Not found.'})
+
+    def test_read_only(self):
+        response = self.request('post', '/api/tags/', {}, self.user)
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,54 @@
+from food_api.tests.base import FoodgramTestCase
+from recipes.models import Recipes
+
+RECIPES_LIMIT = 2
+
+
+class SubscriptionsTest(FoodgramTestCase):
+    """Список подписок с превью последних рецептов авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.authors = [
+            cls.create_user(f'author{number}') for number in range(20)
+        ]
+        for recipe_number in range(4):
+            for author in cls.authors:
+                cls.create_recipe(author, name=f'Рецепт {recipe_number}')
+        cls.follower = cls.create_user('follower')
+        cls.subscribe(cls.follower, cls.authors[:1])
+        cls.subscribe(cls.user, cls.authors)
+
+    def get_subscriptions(self, user):
+        response, queries = self.count_queries(
+            'get',
+            f'/api/users/subscriptions/?limit=20'
+            f'&recipes_limit={RECIPES_LIMIT}',
+            user=user
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data['results'], queries
+
+    def test_queries_do_not_depend_on_authors(self):
+        one_author, one_author_queries = self.get_subscriptions(
+            self.follower
+        )
+        all_authors, all_authors_queries = self.get_subscriptions(self.user)
+        self.assertEqual(len(one_author), 1)
+        self.assertEqual(len(all_authors), 20)
+        self.assertEqual(one_author_queries, all_authors_queries)
+
+    def test_previews_are_newest_recipes_of_author(self):
+        results, _ = self.get_subscriptions(self.user)
+        for author in results:
+            newest = list(
+                Recipes.objects.filter(
+                    author_id=author['id']
+                ).order_by('-id').values_list('id', flat=True)[:RECIPES_LIMIT]
+            )
+            self.assertEqual(
+                [recipe['id'] for recipe in author['recipes']],
+                newest
+            )
+            self.assertEqual(author['recipes_count'], 4)
@@ -2,24 +2,34 @@ from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from food_api.views import (
-    IngredientsViewSet,
-    TagsViewSet,
     RecipesViewSet,
-    UserViewSet
+    UserViewSet,
+    ingredients_detail,
+    ingredients_list,
+    metrics,
+    tags_detail,
+    tags_list
 )
 
 app_name = 'food_api'
 
 router = DefaultRouter()
 
-router.register('ingredients', IngredientsViewSet)
-router.register('tags', TagsViewSet)
 router.register('recipes', RecipesViewSet, basename='Recipes')
 router.register('users', UserViewSet)
 
 
 urlpatterns = [
+    path('ingredients/', ingredients_list, name='ingredients-list'),
+    path(
+        'ingredients/<str:pk>/',
+        ingredients_detail,
+        name='ingredients-detail'
+    ),
+    path('tags/', tags_list, name='tags-list'),
+    path('tags/<str:pk>/', tags_detail, name='tags-detail'),
     path('', include(router.urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
+    path('metrics/', metrics, name='metrics'),
 ]
@@ -1,12 +1,39 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum, Exists, OuterRef
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import (
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Prefetch,
+    Window
+)
+from django.db.models.functions import Greatest, RowNumber
+from django.db import IntegrityError
+from django.db.transaction import atomic
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import FileResponse
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotAllowed,
+    JsonResponse,
+    StreamingHttpResponse
+)
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from django.utils.cache import (
+    get_conditional_response,
+    patch_cache_control,
+    patch_vary_headers
+)
+from django.utils.http import quote_etag
 from djoser.views import UserViewSet as DjoserUserViewSet
 from rest_framework import viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.status import (
@@ -15,81 +42,193 @@ from rest_framework.status import (
     HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND
 )
-import tempfile
+from functools import wraps
+from hashlib import md5
 
-from food_api.pagination import PageSizePagination
+from food_api.cache import (
+    ingredients_cache,
+    recipes_list_cache,
+    tags_cache
+)
+from food_api.metrics import render_metrics
+from food_api.pagination import FeedPagination, PageSizePagination
+from food_api.parsers import RecipeJSONParser
 from food_api.permissions import IsAuthorOrReadOnly
+from food_api.renderers import (
+    ShoppingListCSVRenderer,
+    ShoppingListJSONRenderer,
+    ShoppingListTextRenderer
+)
 from food_api.serializers import (
-    IngredientSerializer,
-    TagSerializer,
     UserSerializer,
     SubscribeSerializer,
     RecipeSerializer,
+    RecipeListSerializer,
     RecipeAddSerializer,
-    RecipesShortSerializer
-)
-from food_api.filters import (
-    IngredientFilter,
-    RecipeFilter
+    RecipesShortSerializer,
+    recipe_prefetches
 )
+from food_api.filters import IdOrderingFilter, RecipeFilter
 from recipes.models import (
     Recipes,
-    Tags,
-    Ingredients,
-    IngredientsRecipes,
     Favorites,
-    Carts
+    Carts,
+    CartsIngredients,
+    Feeds
 )
 from users.models import Subscribe
 
 User = get_user_model()
 
 
+def annotate_is_subscribed(queryset, user):
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Subscribe.objects.filter(
+                user=user,
+                author=OuterRef('id')
+            )
+        )
+    )
+
+
+def annotate_is_favorited(queryset, user):
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorites.objects.filter(
+                recipe=OuterRef('id'),
+                user=user
+            )
+        ),
+        is_in_shopping_cart=Exists(
+            Carts.objects.filter(
+                recipe=OuterRef('id'),
+                user=user
+            )
+        )
+    )
+
+
 class ShoppingCartMixin:
+    def get_shopping_list(self, user):
+        return CartsIngredients.objects.filter(
+            user=user
+        ).values(
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ).order_by('name', 'measurement_unit')
+
     @action(
         methods=['get'],
         detail=False,
-        permission_classes=(IsAuthenticated,)
+        permission_classes=(IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer
+        )
     )
     def download_shopping_cart(self, request):
-        ingredients = IngredientsRecipes.objects.filter(
-            recipe__carts__user=request.user
-        ).values(
-            'ingredient__name',
-            'ingredient__measurement_unit'
-        ).annotate(amount_of_ingredient=Sum('amount'))
+        renderer = request.accepted_renderer
+        # Список меняется вместе с версией корзины пользователя, а
+        # названия и единицы измерения - с версией справочника
+        # ингредиентов, поэтому ETag считается без чтения списка.
+        etag = quote_etag(md5(
+            f'{renderer.format}:{request.user.cart_version}:'
+            f'{ingredients_cache.get_version()}'.encode()
+        ).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
+        ingredients = self.get_shopping_list(request.user)
         today = timezone.now()
-        filename = f'{today:%Y-%m-%d}_shopping_list.txt'
-        shopping_list = 'Your personal shopping list:'
-        temporary = tempfile.NamedTemporaryFile()
-        with open(temporary.name, 'w') as file:
-            file.write(shopping_list)
-            for ingredient in ingredients:
-                file.write(
-                    f'\n{ingredient["ingredient__name"]} - '
-                    f'{ingredient["amount_of_ingredient"]} '
-                    f'{ingredient["ingredient__measurement_unit"]}'
-                )
-        file = open(temporary.name, 'rb')
-        response = FileResponse(
-            file,
-            filename=filename,
-            as_attachment=True,
-            content_type='text/plain'
+        filename = f'{today:%Y-%m-%d}_shopping_list.{renderer.format}'
+        if isinstance(request._request, ASGIRequest):
+            content = renderer.astream(ingredients.aiterator())
+        else:
+            content = renderer.stream(ingredients.iterator())
+        return StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+            headers={
+                'Content-Disposition': f'attachment; filename="{filename}"',
+                'ETag': etag
+            }
         )
-        return response
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Tags.objects.all()
-    serializer_class = TagSerializer
+def reference_view(view):
+    """Асинхронное представление справочника только для чтения.
+
+    Справочники целиком лежат в ReferenceCache, поэтому представления
+    обходятся без DRF и в режиме ASGI не занимают поток.
+    """
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(('GET', 'HEAD'))
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def reference_response(request, data, get_payload):
+    response = get_conditional_response(
+        request,
+        etag=data.etag,
+        last_modified=data.last_modified
+    )
+    if response is None:
+        response = JsonResponse(
+            get_payload(),
+            safe=False,
+            json_dumps_params={'ensure_ascii': False}
+        )
+    for header, value in data.headers.items():
+        response[header] = value
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def reference_item_response(request, data, pk):
+    item = data.by_id.get(int(pk)) if pk.isdigit() else None
+    if item is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    return reference_response(request, data, lambda: item)
+
+
+@reference_view
+async def tags_list(request):
+    data = await tags_cache.aget()
+    return reference_response(request, data, lambda: data.items)
+
+
+@reference_view
+async def tags_detail(request, pk):
+    return reference_item_response(request, await tags_cache.aget(), pk)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Ingredients.objects.all()
-    serializer_class = IngredientSerializer
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientFilter
+@reference_view
+async def ingredients_list(request):
+    data = await ingredients_cache.aget()
+    name = request.GET.get('name')
+    limit = request.GET.get('limit', '')
+    limit = int(limit) if limit.isdigit() else None
+    if not name:
+        return reference_response(request, data, lambda: data.items[:limit])
+    return reference_response(request, data, lambda: data.search(name, limit))
+
+
+@reference_view
+async def ingredients_detail(request, pk):
+    return reference_item_response(
+        request,
+        await ingredients_cache.aget(),
+        pk
+    )
 
 
 class UserViewSet(DjoserUserViewSet):
@@ -97,6 +236,29 @@ class UserViewSet(DjoserUserViewSet):
     serializer_class = UserSerializer
     pagination_class = PageSizePagination
 
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(),
+            self.request.user
+        )
+
+    def get_subscriptions_queryset(self):
+        recipes = Recipes.objects.all()
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=F('id').desc()
+                )
+            ).filter(row_number__lte=int(recipes_limit))
+        return self.get_queryset().annotate(
+            recipes_count=Count('recipes')
+        ).order_by('-id').prefetch_related(
+            Prefetch('recipes', queryset=recipes)
+        )
+
     def get_permissions(self):
         if self.action == 'me':
             self.permission_classes = [IsAuthenticated]
@@ -109,26 +271,42 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscribe(self, request, **kwargs):
         user = request.user
-        author = get_object_or_404(User, id=self.kwargs.get('id'))
+        author = get_object_or_404(
+            self.get_subscriptions_queryset(),
+            id=self.kwargs.get('id')
+        )
+        if user == author:
+            raise ValidationError(
+                detail='You can\'t follow yourself!',
+                code=HTTP_400_BAD_REQUEST
+            )
+        try:
+            with atomic():
+                Subscribe.objects.create(user=user, author=author)
+                Feeds.objects.backfill(user.id, author.id)
+        except IntegrityError:
+            raise ValidationError(
+                detail='You already follow this user!',
+                code=HTTP_400_BAD_REQUEST
+            )
+        author.is_subscribed = True
         serializer = SubscribeSerializer(
             author,
-            data=request.data,
             context={'request': request}
         )
-        serializer.is_valid(raise_exception=True)
-        Subscribe.objects.create(user=user, author=author)
         return Response(serializer.data, status=HTTP_201_CREATED)
 
     @subscribe.mapping.delete
+    @atomic
     def unsubscribe(self, request, **kwargs):
-        user = request.user
-        author = get_object_or_404(User, id=self.kwargs.get('id'))
         del_count, _ = Subscribe.objects.filter(
-            user=user,
-            author=author
+            user=request.user,
+            author_id=self.kwargs.get('id')
         ).delete()
         if del_count:
+            Feeds.objects.prune(request.user.id, self.kwargs.get('id'))
             return Response(status=HTTP_204_NO_CONTENT)
+        get_object_or_404(User, id=self.kwargs.get('id'))
         return Response(status=HTTP_400_BAD_REQUEST)
 
     @action(
@@ -137,7 +315,9 @@ class UserViewSet(DjoserUserViewSet):
     )
     def subscriptions(self, request):
         user = request.user
-        queryset = User.objects.filter(subscribing__user=user)
+        queryset = self.get_subscriptions_queryset().filter(
+            subscribing__user=user
+        )
         pages = self.paginate_queryset(queryset)
         serializer = SubscribeSerializer(
             pages,
@@ -150,35 +330,87 @@ class UserViewSet(DjoserUserViewSet):
 class RecipesViewSet(ShoppingCartMixin, viewsets.ModelViewSet):
     permission_classes = (IsAuthorOrReadOnly,)
     pagination_class = PageSizePagination
-    filter_backends = (DjangoFilterBackend,)
+    filter_backends = (DjangoFilterBackend, IdOrderingFilter)
     filterset_class = RecipeFilter
+    parser_classes = (RecipeJSONParser, FormParser, MultiPartParser)
+    ordering_fields = ('favorites_count', 'carts_count')
+    counter_fields = {
+        Favorites: 'favorites_count',
+        Carts: 'carts_count',
+    }
 
     def get_queryset(self):
-        queryset = Recipes.objects.select_related(
-            'author'
-        ).prefetch_related(
-            'ingredients'
-        )
-        if not self.request.user.is_authenticated:
-            return queryset
-        return (
-            queryset.annotate(
-                is_favorited=Exists(
-                    Favorites.objects.filter(
-                        recipe=OuterRef('id'),
-                        user=self.request.user
-                    )
-                ),
-                is_in_shopping_cart=Exists(
-                    Carts.objects.filter(
-                        recipe=OuterRef('id'),
-                        user=self.request.user
+        user = self.request.user
+        queryset = Recipes.objects.defer('search_vector')
+        if self.action in ('list', 'feed'):
+            queryset = queryset.select_related('author')
+            if not user.is_authenticated:
+                return queryset
+            return annotate_is_favorited(queryset, user).annotate(
+                author_is_subscribed=Exists(
+                    Subscribe.objects.filter(
+                        user=user,
+                        author=OuterRef('author_id')
                     )
                 )
             )
+        queryset = queryset.prefetch_related(*recipe_prefetches())
+        if not user.is_authenticated:
+            return queryset.select_related('author')
+        return annotate_is_favorited(
+            queryset.prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=annotate_is_subscribed(User.objects.all(), user)
+                )
+            ),
+            user
+        )
+
+    cached_list_params = ('author', 'cursor', 'limit', 'page', 'search')
+    uncached_list_params = ('format', 'ordering')
+
+    def get_list_cache_params(self, request):
+        params = request.query_params
+        if any(param in params for param in self.uncached_list_params):
+            return None
+        return (
+            request.get_host(),
+            tuple(sorted(params.getlist('tags'))),
+            tuple(
+                (param, params[param])
+                for param in self.cached_list_params if param in params
+            )
+        )
+
+    def list(self, request, *args, **kwargs):
+        params = self.get_list_cache_params(request)
+        if request.user.is_authenticated or params is None:
+            return super().list(request, *args, **kwargs)
+        version = recipes_list_cache.get_version()
+        etag = recipes_list_cache.etag(version, params)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            data, result = recipes_list_cache.get_or_build(
+                version,
+                params,
+                lambda: super(RecipesViewSet, self).list(
+                    request, *args, **kwargs
+                ).data
+            )
+            response = Response(data, headers={'X-Cache': result})
+        response['ETag'] = etag
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=settings.RECIPES_CACHE_MAX_AGE
         )
+        patch_vary_headers(response, ('Authorization',))
+        return response
 
     def get_serializer_class(self):
+        if self.action in ('list', 'feed'):
+            return RecipeListSerializer
         if self.request.method in SAFE_METHODS:
             return RecipeSerializer
         return RecipeAddSerializer
@@ -186,31 +418,62 @@ class RecipesViewSet(ShoppingCartMixin, viewsets.ModelViewSet):
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=False,
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        recipes = self.filter_queryset(Recipes.objects.all())
+        if not recipes.query.has_filters():
+            recipes = None
+        paginator = FeedPagination()
+        pages = paginator.paginate_queryset(
+            self.get_queryset(),
+            request,
+            self,
+            get_ids=lambda **page: Feeds.objects.recipe_ids(
+                request.user, recipes=recipes, **page
+            )
+        )
+        serializer = self.get_serializer(pages, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
     def add_recipe(self, model, user, id):
-        if not Recipes.objects.filter(id=id).exists():
+        recipe = Recipes.objects.filter(id=id).first()
+        if recipe is None:
             return Response(
                 {'error': 'Recipe doesn\'t exist!'},
                 status=HTTP_400_BAD_REQUEST
             )
-        if model.objects.filter(user=user, recipe__id=id).exists():
+        counter = self.counter_fields[model]
+        try:
+            with atomic():
+                model.objects.create(user=user, recipe=recipe)
+                Recipes.objects.filter(id=recipe.id).update(
+                    **{counter: F(counter) + 1}
+                )
+        except IntegrityError:
             return Response(
                 {'error': 'Recipe already added!'},
                 status=HTTP_400_BAD_REQUEST
             )
-        recipe = get_object_or_404(Recipes, id=id)
-        model.objects.create(user=user, recipe=recipe)
         serializer = RecipesShortSerializer(recipe)
         return Response(serializer.data, status=HTTP_201_CREATED)
 
+    @atomic
     def delete_recipe(self, model, user, id):
+        del_count, _ = model.objects.filter(user=user, recipe_id=id).delete()
+        if del_count:
+            counter = self.counter_fields[model]
+            Recipes.objects.filter(id=id).update(
+                **{counter: Greatest(F(counter) - del_count, 0)}
+            )
+            return Response(status=HTTP_204_NO_CONTENT)
         if not Recipes.objects.filter(id=id).exists():
             return Response(
                 {'error': 'Recipe doesn\'t exist!'},
                 status=HTTP_404_NOT_FOUND
             )
-        del_count, _ = model.objects.filter(user=user, recipe__id=id).delete()
-        if del_count:
-            return Response(status=HTTP_204_NO_CONTENT)
         return Response(
             {'error': 'Recipe isn\'t added, can\'t be deleted'},
             status=HTTP_400_BAD_REQUEST
@@ -239,3 +502,19 @@ class RecipesViewSet(ShoppingCartMixin, viewsets.ModelViewSet):
     @shopping_cart.mapping.delete
     def del_shopping_cart(self, request, pk):
         return self.delete_recipe(Carts, request.user, pk)
+
+
+def metrics(request):
+    if not settings.METRICS_ENABLED or not settings.METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        response = HttpResponse('Invalid metrics token.', status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+    return HttpResponse(
+        render_metrics(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
@@ -1,5 +1,8 @@
 import os
 from pathlib import Path
+from tempfile import gettempdir
+
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -38,6 +41,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'food_api.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -82,10 +86,37 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', ''),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', 'localhost'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv(
+            'DB_CONN_MAX_AGE',
+            0 if os.getenv('SERVER_MODE') == 'asgi' else 60
+        )),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS') != 'False',
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER') == 'True'
+    }
+}
+
+# Версии кэшей и кэш ответов должны быть общими для всех процессов
+# gunicorn, поэтому локальный кэш процесса допустим только при DEBUG.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(gettempdir(), 'foodgram_cache')
+        ),
     }
 }
 
+if not DEBUG and CACHES['default']['BACKEND'].endswith('.LocMemCache'):
+    raise ImproperlyConfigured(
+        'LocMemCache is not shared between worker processes, '
+        'use FileBasedCache or RedisCache.'
+    )
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -157,4 +188,40 @@ DJOSER = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+MAX_IMAGE_UPLOAD_SIZE = int(
+    os.getenv('MAX_IMAGE_UPLOAD_SIZE', 5 * 1024 * 1024)
+)
+
+RECIPES_CACHE_TIMEOUT = int(os.getenv('RECIPES_CACHE_TIMEOUT', 300))
+RECIPES_CACHE_MAX_AGE = int(os.getenv('RECIPES_CACHE_MAX_AGE', 30))
+
+FEED_FANOUT_LIMIT = int(os.getenv('FEED_FANOUT_LIMIT', 1000))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+
+# /api/metrics/ доступен только с заголовком Authorization: Bearer
+# METRICS_TOKEN, без токена он отключён. Метрики хранятся в каждом
+# воркере отдельно, см. food_api.metrics.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_SAMPLE_RATE = float(os.getenv('METRICS_SAMPLE_RATE', 0.1))
+METRICS_SLOW_QUERIES = int(os.getenv('METRICS_SLOW_QUERIES', 3))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'food_api.metrics': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 CSRF_TRUSTED_ORIGINS = [os.getenv('CSRF_TRUSTED', 'puk')]
@@ -6,7 +6,9 @@ from recipes.models import (
     Ingredients,
     IngredientsRecipes,
     Favorites,
-    Carts
+    Carts,
+    CartsIngredients,
+    Feeds
 )
 
 
@@ -18,13 +20,12 @@ class RecipesAdmin(admin.ModelAdmin):
         'image',
         'text',
         'cooking_time',
-        'favorite_count'
+        'favorites_count',
+        'carts_count'
     )
     list_filter = ('author', 'name', 'tags')
     filter_horizontal = ('tags', 'ingredients')
-
-    def favorite_count(self, obj):
-        return Favorites.objects.filter(recipe_id=obj.id).count()
+    readonly_fields = ('favorites_count', 'carts_count', 'in_feeds')
 
 
 class IngredientsAdmin(admin.ModelAdmin):
@@ -53,3 +54,5 @@ admin.site.register(Tags, TagsAdmin)
 admin.site.register(IngredientsRecipes)
 admin.site.register(Favorites)
 admin.site.register(Carts)
+admin.site.register(CartsIngredients)
+admin.site.register(Feeds)
@@ -0,0 +1,87 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections
+from django.db.models import F
+from django.db.transaction import on_commit
+from PIL import Image, ImageOps
+
+from food_api.cache import recipes_list_cache
+from recipes.models import Recipes
+
+MAX_IMAGE_SIZE = 1600
+THUMBNAIL_WIDTHS = (320, 640)
+THUMBNAIL_FORMATS = (('WEBP', 'webp'), ('JPEG', 'jpg'))
+DEFAULT_THUMBNAIL = (640, 'webp')
+
+logger = logging.getLogger(__name__)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+
+
+def thumbnail_name(image_name, width, extension):
+    stem = PurePosixPath(image_name).stem
+    return f'recipes/thumbnails/{stem}_{width}.{extension}'
+
+
+def encode(image, image_format):
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=85)
+    return ContentFile(buffer.getvalue())
+
+
+def replace(name, content):
+    default_storage.delete(name)
+    return default_storage.save(name, content)
+
+
+def process_image(recipe_id):
+    """Ограничивает размер оригинала и строит превью рецепта."""
+    recipe = Recipes.objects.filter(id=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    name = recipe.image.name
+    with default_storage.open(name, 'rb') as file:
+        original = Image.open(file)
+        original_format = original.format
+        original.load()
+    image = ImageOps.exif_transpose(original)
+    if max(image.size) > MAX_IMAGE_SIZE:
+        image.thumbnail((MAX_IMAGE_SIZE, MAX_IMAGE_SIZE))
+        replace(name, encode(image, original_format))
+    for width in THUMBNAIL_WIDTHS:
+        thumbnail = image.copy()
+        thumbnail.thumbnail((width, MAX_IMAGE_SIZE))
+        for image_format, extension in THUMBNAIL_FORMATS:
+            replace(
+                thumbnail_name(name, width, extension),
+                encode(thumbnail, image_format)
+            )
+    Recipes.objects.filter(id=recipe_id, image=name).update(
+        thumbnail=thumbnail_name(name, *DEFAULT_THUMBNAIL),
+        version=F('version') + 1
+    )
+    recipes_list_cache.invalidate()
+
+
+def process_image_in_worker(recipe_id):
+    try:
+        process_image(recipe_id)
+    except Exception:
+        logger.exception('Failed to process image of recipe %s', recipe_id)
+    finally:
+        connections.close_all()
+
+
+def schedule_image_processing(recipe_id):
+    on_commit(lambda: executor.submit(process_image_in_worker, recipe_id))
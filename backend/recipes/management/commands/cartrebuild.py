@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic
+
+from recipes.models import CartsIngredients
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the aggregated shopping carts and verifies them '
+        'against the live aggregation.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only verify the table, do not rebuild it.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with atomic():
+                CartsIngredients.objects.rebuild()
+        live = {
+            (user_id, ingredient_id): total
+            for user_id, ingredient_id, total
+            in CartsIngredients.objects.live_totals()
+        }
+        stored = {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount
+            in CartsIngredients.objects.values_list(
+                'user_id', 'ingredient_id', 'amount'
+            )
+        }
+        mismatches = {
+            key for key in live.keys() | stored.keys()
+            if live.get(key) != stored.get(key)
+        }
+        if mismatches:
+            raise CommandError(
+                f'{len(mismatches)} rows differ from the live aggregation.'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(stored)} rows match the live aggregation.'
+        ))
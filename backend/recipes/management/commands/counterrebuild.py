@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Carts, Favorites, Recipes
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                recipe=OuterRef('id')
+            ).values('recipe').annotate(
+                count=Count('id')
+            ).values('count')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = 'Reconciles favorites_count and carts_count on recipes.'
+
+    def handle(self, *args, **options):
+        drifted = Recipes.objects.annotate(
+            live_favorites_count=count_subquery(Favorites),
+            live_carts_count=count_subquery(Carts)
+        ).filter(
+            ~Q(favorites_count=F('live_favorites_count'))
+            | ~Q(carts_count=F('live_carts_count'))
+        ).values_list('id', flat=True)
+        updated = Recipes.objects.filter(id__in=list(drifted)).update(
+            favorites_count=count_subquery(Favorites),
+            carts_count=count_subquery(Carts)
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'{updated} recipes had their counters fixed.'
+        ))
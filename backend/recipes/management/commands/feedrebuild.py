@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from django.db.transaction import atomic
+
+from recipes.models import Feeds, Recipes
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the subscription feeds from subscriptions and recipes.'
+
+    def handle(self, *args, **options):
+        with atomic():
+            Feeds.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'{Feeds.objects.count()} feed rows built, '
+            f'{Recipes.objects.filter(in_feeds=False).count()} recipes '
+            f'are served from subscriptions on read.'
+        ))
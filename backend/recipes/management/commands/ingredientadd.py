@@ -1,16 +1,87 @@
+import csv
 import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.transaction import atomic, on_commit
+
+from food_api.cache import ingredients_cache
 from recipes.models import Ingredients
 
+DEFAULT_PATH = Path(__file__).resolve().parent / 'ingredients.json'
+
+
+def read_json(file):
+    for number, row in enumerate(json.load(file), 1):
+        try:
+            yield row['name'], row['measurement_unit']
+        except (KeyError, TypeError):
+            raise CommandError(
+                f'Item {number}: expected name and measurement_unit.'
+            )
+
+
+def read_csv(file):
+    rows = csv.reader(file)
+    for row in rows:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Line {rows.line_num}: expected name and measurement unit.'
+            )
+        yield row[0], row[1]
+
+
+READERS = {
+    '.json': read_json,
+    '.csv': read_csv,
+}
+
 
 class Command(BaseCommand):
+    help = 'Loads ingredients from a JSON or CSV file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            nargs='?',
+            default=DEFAULT_PATH,
+            type=Path,
+            help='Path to ingredients.json or ingredients.csv.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows per INSERT.'
+        )
 
     def handle(self, *args, **options):
-        with open('ingredients.json', 'rb') as f:
-            data = json.load(f)
-            for i in data:
-                ingredient = Ingredients()
-                ingredient.name = i['name']
-                ingredient.measurement_unit = i['measurement_unit']
-                ingredient.save()
+        path = options['path']
+        reader = READERS.get(path.suffix.lower())
+        if reader is None:
+            raise CommandError(f'Unsupported file type: {path.suffix}')
+        if not path.is_file():
+            raise CommandError(f'File not found: {path}')
+        batch_size = options['batch_size']
+        started = time.perf_counter()
+        rows = 0
+        with open(path, encoding='utf-8') as file, atomic():
+            count_before = Ingredients.objects.count()
+            ingredients = (
+                Ingredients(name=name.strip(), measurement_unit=unit.strip())
+                for name, unit in reader(file)
+            )
+            while batch := list(islice(ingredients, batch_size)):
+                Ingredients.objects.bulk_create(batch, ignore_conflicts=True)
+                rows += len(batch)
+            created = Ingredients.objects.count() - count_before
+            on_commit(ingredients_cache.invalidate)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{rows} rows read, {created} ingredients added '
+            f'in {elapsed:.2f}s ({rows / elapsed:.0f} rows/s).'
+        ))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from recipes.images import process_image
+from recipes.models import Recipes
+
+
+class Command(BaseCommand):
+    help = 'Builds thumbnails for recipes that do not have them yet.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Rebuild thumbnails for every recipe.'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipes.objects.exclude(image='')
+        if not options['all']:
+            recipes = recipes.filter(thumbnail='')
+        recipe_ids = list(recipes.values_list('id', flat=True))
+        for recipe_id in recipe_ids:
+            process_image(recipe_id)
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(recipe_ids)} recipe images processed.'
+        ))
@@ -0,0 +1,75 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:19
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def fill_carts_ingredients(apps, schema_editor):
+    Carts = apps.get_model('recipes', 'Carts')
+    CartsIngredients = apps.get_model('recipes', 'CartsIngredients')
+    totals = Carts.objects.values(
+        'user_id',
+        'recipe__ingredientsrecipes__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__ingredientsrecipes__amount')
+    ).filter(
+        total__gt=0
+    ).values_list(
+        'user_id',
+        'recipe__ingredientsrecipes__ingredient_id',
+        'total'
+    ).order_by()
+    CartsIngredients.objects.bulk_create(
+        (
+            CartsIngredients(
+                user_id=user_id,
+                ingredient_id=ingredient_id,
+                amount=total
+            )
+            for user_id, ingredient_id, total in totals
+        ),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0006_alter_carts_options_alter_favorites_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='ingredients',
+            options={'ordering': ['name'], 'verbose_name': 'Ингредиент', 'verbose_name_plural': 'Ингредиенты'},
+        ),
+        migrations.AlterModelOptions(
+            name='ingredientsrecipes',
+            options={'ordering': ['-id'], 'verbose_name': 'Ингредиенты в рецепте', 'verbose_name_plural': 'Ингредиенты в рецептах'},
+        ),
+        migrations.CreateModel(
+            name='CartsIngredients',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='carts_ingredients', to='recipes.ingredients', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='carts_ingredients', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Ингредиент в корзине',
+                'verbose_name_plural': 'Ингредиенты в корзинах',
+                'ordering': ['-id'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='cartsingredients',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='cart_ingredient_for_user'),
+        ),
+        migrations.RunPython(
+            fill_carts_ingredients,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:23
+
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def merge_rows(model, owner_field, keep_id, duplicate_ids):
+    for row in model.objects.filter(ingredient_id__in=duplicate_ids):
+        target = model.objects.filter(
+            ingredient_id=keep_id,
+            **{owner_field: getattr(row, owner_field)}
+        ).first()
+        if target is None:
+            row.ingredient_id = keep_id
+            row.save(update_fields=['ingredient'])
+        else:
+            target.amount += row.amount
+            target.save(update_fields=['amount'])
+            row.delete()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredients = apps.get_model('recipes', 'Ingredients')
+    IngredientsRecipes = apps.get_model('recipes', 'IngredientsRecipes')
+    CartsIngredients = apps.get_model('recipes', 'CartsIngredients')
+    duplicates = Ingredients.objects.values(
+        'name',
+        'measurement_unit'
+    ).annotate(
+        keep_id=Min('id'),
+        count=Count('id')
+    ).filter(count__gt=1).order_by()
+    for duplicate in duplicates:
+        duplicate_ids = list(Ingredients.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit']
+        ).exclude(
+            id=duplicate['keep_id']
+        ).values_list('id', flat=True))
+        merge_rows(
+            IngredientsRecipes,
+            'recipe_id',
+            duplicate['keep_id'],
+            duplicate_ids
+        )
+        merge_rows(
+            CartsIngredients,
+            'user_id',
+            duplicate['keep_id'],
+            duplicate_ids
+        )
+        Ingredients.objects.filter(id__in=duplicate_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_cartsingredients'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:24
+
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def delete_duplicates(model):
+    duplicates = model.objects.values(
+        'user_id',
+        'recipe_id'
+    ).annotate(
+        keep_id=Min('id'),
+        count=Count('id')
+    ).filter(count__gt=1).order_by()
+    user_ids = set()
+    for duplicate in duplicates:
+        model.objects.filter(
+            user_id=duplicate['user_id'],
+            recipe_id=duplicate['recipe_id']
+        ).exclude(id=duplicate['keep_id']).delete()
+        user_ids.add(duplicate['user_id'])
+    return user_ids
+
+
+def delete_duplicate_favorites_and_carts(apps, schema_editor):
+    Favorites = apps.get_model('recipes', 'Favorites')
+    Carts = apps.get_model('recipes', 'Carts')
+    CartsIngredients = apps.get_model('recipes', 'CartsIngredients')
+    delete_duplicates(Favorites)
+    user_ids = delete_duplicates(Carts)
+    if not user_ids:
+        return
+    CartsIngredients.objects.filter(user_id__in=user_ids).delete()
+    totals = Carts.objects.filter(
+        user_id__in=user_ids
+    ).values(
+        'user_id',
+        'recipe__ingredientsrecipes__ingredient_id'
+    ).annotate(
+        total=Sum('recipe__ingredientsrecipes__amount')
+    ).filter(
+        total__gt=0
+    ).values_list(
+        'user_id',
+        'recipe__ingredientsrecipes__ingredient_id',
+        'total'
+    ).order_by()
+    CartsIngredients.objects.bulk_create(
+        CartsIngredients(
+            user_id=user_id,
+            ingredient_id=ingredient_id,
+            amount=total
+        )
+        for user_id, ingredient_id, total in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            delete_duplicate_favorites_and_carts,
+            migrations.RunPython.noop
+        ),
+    ]
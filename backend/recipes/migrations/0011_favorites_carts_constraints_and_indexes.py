@@ -0,0 +1,29 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_delete_duplicate_favorites_and_carts'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='ingredientsrecipes',
+            index=models.Index(fields=['recipe', 'ingredient'], name='recipe_ingredient_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['author', '-id'], name='recipes_author_id_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='carts',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='recipe_for_user'),
+        ),
+        migrations.AddConstraint(
+            model_name='favorites',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='favorite_for_user'),
+        ),
+    ]
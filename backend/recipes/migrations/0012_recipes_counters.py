@@ -0,0 +1,53 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:25
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_subquery(model):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                recipe=OuterRef('id')
+            ).values('recipe').annotate(
+                count=Count('id')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Recipes = apps.get_model('recipes', 'Recipes')
+    Favorites = apps.get_model('recipes', 'Favorites')
+    Carts = apps.get_model('recipes', 'Carts')
+    Recipes.objects.update(
+        favorites_count=count_subquery(Favorites),
+        carts_count=count_subquery(Carts)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_favorites_carts_constraints_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='carts_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В корзинах'),
+        ),
+        migrations.AddField(
+            model_name='recipes',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='В избранном'),
+        ),
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(fields=['-favorites_count', '-id'], name='recipes_favorites_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
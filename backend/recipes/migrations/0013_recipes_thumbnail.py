@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipes_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='thumbnail',
+            field=models.ImageField(blank=True, default='', upload_to='recipes/thumbnails/', verbose_name='Превью'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:33
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+SEARCH_INDEX = GinIndex(
+    fields=['search_vector'],
+    name='recipes_search_vector_idx'
+)
+
+
+def fill_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipes = apps.get_model('recipes', 'Recipes')
+    IngredientsRecipes = apps.get_model('recipes', 'IngredientsRecipes')
+    ingredient_names = IngredientsRecipes.objects.filter(
+        recipe=OuterRef('id')
+    ).values('recipe').annotate(
+        names=StringAgg('ingredient__name', ' ')
+    ).values('names')
+    Recipes.objects.update(
+        search_vector=(
+            SearchVector('name', weight='A', config='russian')
+            + SearchVector(
+                Subquery(ingredient_names),
+                weight='B',
+                config='russian'
+            )
+            + SearchVector('text', weight='C', config='russian')
+        )
+    )
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_index(
+            apps.get_model('recipes', 'Recipes'),
+            SEARCH_INDEX
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_index(
+            apps.get_model('recipes', 'Recipes'),
+            SEARCH_INDEX
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipes_thumbnail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(fill_search_vector, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='recipes',
+                    index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipes_search_vector_idx'),
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.11 on 2026-10-18 19:35
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0014_recipes_search_vector'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='in_feeds',
+            field=models.BooleanField(default=False, verbose_name='Разослан в ленты'),
+        ),
+        migrations.CreateModel(
+            name='Feeds',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feeds', to='recipes.recipes', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feeds', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в ленте',
+                'verbose_name_plural': 'Ленты подписок',
+                'ordering': ['-recipe'],
+                'indexes': [models.Index(fields=['user', 'author'], name='feed_user_author_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='feeds',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='feed_recipe_for_user'),
+        ),
+    ]
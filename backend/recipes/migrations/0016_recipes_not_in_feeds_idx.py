@@ -0,0 +1,17 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0015_feeds'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipes',
+            index=models.Index(condition=models.Q(('in_feeds', False)), fields=['-id'], name='recipes_not_in_feeds_idx'),
+        ),
+    ]
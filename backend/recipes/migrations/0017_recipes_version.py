@@ -0,0 +1,18 @@
+# Generated by Django 4.2.11 on 2026-10-18 20:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0016_recipes_not_in_feeds_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipes',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Версия'),
+        ),
+    ]
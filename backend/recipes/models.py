@@ -1,9 +1,47 @@
+from collections import defaultdict
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import F, OuterRef, Q, Subquery, Sum
+from django.db.transaction import atomic
+
+from users.models import Subscribe
 
 User = get_user_model()
 
+SEARCH_CONFIG = 'russian'
+
+
+class RecipesManager(models.Manager):
+    def bump_versions(self, recipes):
+        """Увеличивает версии рецептов по списку id или запросу id."""
+        self.filter(id__in=recipes).update(version=F('version') + 1)
+
+    def update_search_vector(self, recipe_ids):
+        if connections[self.db].vendor != 'postgresql':
+            return
+        ingredient_names = IngredientsRecipes.objects.filter(
+            recipe=OuterRef('id')
+        ).values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+        self.filter(id__in=recipe_ids).update(
+            search_vector=(
+                SearchVector('name', weight='A', config=SEARCH_CONFIG)
+                + SearchVector(
+                    Subquery(ingredient_names),
+                    weight='B',
+                    config=SEARCH_CONFIG
+                )
+                + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+            )
+        )
+
 
 class Recipes(models.Model):
     author = models.ForeignKey(
@@ -19,6 +57,12 @@ class Recipes(models.Model):
         upload_to='recipes/images/',
         default=None
     )
+    thumbnail = models.ImageField(
+        'Превью',
+        upload_to='recipes/thumbnails/',
+        blank=True,
+        default=''
+    )
     text = models.TextField('Описание')
     ingredients = models.ManyToManyField(
         'Ingredients',
@@ -39,15 +83,62 @@ class Recipes(models.Model):
         'Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        'В избранном',
+        default=0
+    )
+    carts_count = models.PositiveIntegerField(
+        'В корзинах',
+        default=0
+    )
+    in_feeds = models.BooleanField(
+        'Разослан в ленты',
+        default=False
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        'Поисковый вектор',
+        null=True,
+        editable=False
+    )
+
+    objects = RecipesManager()
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['author', '-id'],
+                name='recipes_author_id_idx'
+            ),
+            models.Index(
+                fields=['-favorites_count', '-id'],
+                name='recipes_favorites_count_idx'
+            ),
+            models.Index(
+                fields=['-id'],
+                name='recipes_not_in_feeds_idx',
+                condition=Q(in_feeds=False)
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipes_search_vector_idx'
+            )
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
     def __str__(self) -> str:
         return f'{self.name}'
 
+    @property
+    def preview(self):
+        return self.thumbnail or self.image
+
 
 class Tags(models.Model):
     name = models.CharField('Название', max_length=200, unique=True)
@@ -69,6 +160,12 @@ class Ingredients(models.Model):
 
     class Meta:
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            )
+        ]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
@@ -97,6 +194,12 @@ class IngredientsRecipes(models.Model):
 
     class Meta:
         ordering = ['-id']
+        indexes = [
+            models.Index(
+                fields=['recipe', 'ingredient'],
+                name='recipe_ingredient_idx'
+            )
+        ]
         verbose_name = 'Ингредиенты в рецепте'
         verbose_name_plural = 'Ингредиенты в рецептах'
 
@@ -123,7 +226,7 @@ class Favorites(models.Model):
 
     class Meta:
         ordering = ['-id']
-        models.constraints = [
+        constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
                 name='favorite_for_user'
@@ -152,7 +255,7 @@ class Carts(models.Model):
 
     class Meta:
         ordering = ['-id']
-        models.constraints = [
+        constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
                 name='recipe_for_user'
@@ -160,3 +263,310 @@ class Carts(models.Model):
         ]
         verbose_name = 'Корзина покупок'
         verbose_name_plural = 'Корзины покупок'
+
+
+class CartsIngredientsManager(models.Manager):
+    def recipe_amounts(self, recipe_id):
+        return dict(
+            IngredientsRecipes.objects.filter(
+                recipe_id=recipe_id
+            ).values(
+                'ingredient_id'
+            ).annotate(
+                total=Sum('amount')
+            ).values_list('ingredient_id', 'total').order_by()
+        )
+
+    def live_totals(self, user_ids=None):
+        queryset = Carts.objects.all()
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        return queryset.values(
+            'user_id',
+            'recipe__ingredientsrecipes__ingredient_id'
+        ).annotate(
+            total=Sum('recipe__ingredientsrecipes__amount')
+        ).filter(
+            total__gt=0
+        ).values_list(
+            'user_id',
+            'recipe__ingredientsrecipes__ingredient_id',
+            'total'
+        ).order_by()
+
+    @atomic(savepoint=False)
+    def apply(self, user_ids, amounts):
+        user_ids = sorted(set(user_ids))
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+        # Блокируем пользователей, чтобы параллельные изменения корзины
+        # одного пользователя не создавали одинаковые строки. Блокировка
+        # берётся по порядку id в подзапросе и увеличивает версии их
+        # списков покупок.
+        self.bump_versions(
+            User.objects.select_for_update().filter(
+                id__in=user_ids
+            ).order_by('id').values('id')
+        )
+        existing = {
+            (item.user_id, item.ingredient_id): item
+            for item in self.select_for_update().filter(
+                user_id__in=user_ids,
+                ingredient_id__in=amounts
+            )
+        }
+        changed, removed, created = [], [], []
+        for user_id in user_ids:
+            for ingredient_id, amount in amounts.items():
+                item = existing.get((user_id, ingredient_id))
+                if item is None:
+                    if amount > 0:
+                        created.append(self.model(
+                            user_id=user_id,
+                            ingredient_id=ingredient_id,
+                            amount=amount
+                        ))
+                    continue
+                item.amount += amount
+                if item.amount > 0:
+                    changed.append(item)
+                else:
+                    removed.append(item.id)
+        if changed:
+            self.bulk_update(changed, ['amount'])
+        if removed:
+            self.filter(id__in=removed).delete()
+        if created:
+            self.bulk_create(created)
+
+    def add_recipe(self, user_ids, recipe_id):
+        self.apply(user_ids, self.recipe_amounts(recipe_id))
+
+    def remove_recipe(self, user_ids, recipe_id):
+        self.apply(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in self.recipe_amounts(
+                recipe_id
+            ).items()
+        })
+
+    def apply_recipes(self, changes):
+        """Изменения ингредиентов рецептов во всех корзинах с ними.
+
+        changes - тройки (рецепт, ингредиент, изменение количества).
+        """
+        recipes = defaultdict(lambda: defaultdict(int))
+        for recipe_id, ingredient_id, amount in changes:
+            recipes[recipe_id][ingredient_id] += amount
+        for recipe_id, amounts in recipes.items():
+            self.apply(
+                Carts.objects.filter(
+                    recipe_id=recipe_id
+                ).values_list('user_id', flat=True),
+                amounts
+            )
+
+    def bump_versions(self, user_ids=None):
+        """Увеличивает версии списков покупок для ETag скачивания.
+
+        user_ids - список id или запрос id пользователей.
+        """
+        users = User.objects.all()
+        if user_ids is not None:
+            users = users.filter(id__in=user_ids)
+        users.update(cart_version=F('cart_version') + 1)
+
+    def rebuild(self, user_ids=None):
+        queryset = self.all()
+        if user_ids is not None:
+            queryset = queryset.filter(user_id__in=user_ids)
+        queryset.delete()
+        self.bump_versions(user_ids)
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    ingredient_id=ingredient_id,
+                    amount=total
+                )
+                for user_id, ingredient_id, total in self.live_totals(
+                    user_ids
+                )
+            ),
+            batch_size=1000
+        )
+
+
+class CartsIngredients(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='carts_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredients,
+        on_delete=models.CASCADE,
+        related_name='carts_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField('Количество', default=0)
+
+    objects = CartsIngredientsManager()
+
+    class Meta:
+        ordering = ['-id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='cart_ingredient_for_user'
+            )
+        ]
+        verbose_name = 'Ингредиент в корзине'
+        verbose_name_plural = 'Ингредиенты в корзинах'
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.ingredient} {self.amount}'
+
+
+class FeedsManager(models.Manager):
+    def recipe_ids(self, user, limit, recipes=None, before=None,
+                   after=None):
+        """Первые limit идентификаторов рецептов ленты по убыванию.
+
+        Лента читается по индексу (user, recipe) и объединяется через
+        UNION ALL с рецептами подписок, не разосланными по лентам, по
+        частичному индексу recipes_not_in_feeds_idx. Каждая часть
+        ограничена limit, чтобы не сортировать всю ленту (кроме SQLite,
+        где ограничивается только результат). recipes
+        ограничивает ленту отфильтрованными рецептами. С after
+        идентификаторы идут по возрастанию.
+        """
+        feed = self.filter(user=user)
+        if recipes is None:
+            recipes = Recipes.objects.all()
+        else:
+            feed = feed.filter(recipe__in=recipes.values('id'))
+        fallback = recipes.filter(
+            in_feeds=False,
+            author__in=Subscribe.objects.filter(user=user).values('author_id')
+        )
+        order = '-'
+        if before is not None:
+            feed = feed.filter(recipe_id__lt=before)
+            fallback = fallback.filter(id__lt=before)
+        if after is not None:
+            feed = feed.filter(recipe_id__gt=after)
+            fallback = fallback.filter(id__gt=after)
+            order = ''
+        feed = feed.values_list('recipe_id', flat=True)
+        fallback = fallback.values_list('id', flat=True)
+        if connections[self.db].vendor == 'postgresql':
+            feed = feed.order_by(f'{order}recipe_id')[:limit]
+            fallback = fallback.order_by(f'{order}id')[:limit]
+        else:
+            # SQLite не допускает LIMIT в частях составного запроса.
+            feed, fallback = feed.order_by(), fallback.order_by()
+        return feed.union(fallback, all=True).order_by(
+            f'{order}recipe_id'
+        )[:limit]
+
+    def fan_out(self, recipe_id, author_id):
+        followers = Subscribe.objects.filter(author_id=author_id)
+        if followers.count() > settings.FEED_FANOUT_LIMIT:
+            return
+        with atomic():
+            Recipes.objects.filter(id=recipe_id).update(in_feeds=True)
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id,
+                        recipe_id=recipe_id,
+                        author_id=author_id
+                    )
+                    for user_id in followers.values_list(
+                        'user_id',
+                        flat=True
+                    ).iterator()
+                ),
+                batch_size=1000,
+                ignore_conflicts=True
+            )
+
+    def backfill(self, user_id, author_id):
+        recipe_ids = Recipes.objects.filter(
+            author_id=author_id,
+            in_feeds=True
+        ).order_by('-id').values_list(
+            'id',
+            flat=True
+        )[:settings.FEED_BACKFILL_SIZE]
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=user_id,
+                    recipe_id=recipe_id,
+                    author_id=author_id
+                )
+                for recipe_id in recipe_ids
+            ),
+            ignore_conflicts=True
+        )
+
+    def prune(self, user_id, author_id):
+        self.filter(user_id=user_id, author_id=author_id).delete()
+
+    def rebuild(self):
+        self.all().delete()
+        Recipes.objects.update(in_feeds=False)
+        for recipe_id, author_id in Recipes.objects.filter(
+            author__isnull=False
+        ).order_by('id').values_list('id', 'author_id').iterator():
+            self.fan_out(recipe_id, author_id)
+
+
+class Feeds(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feeds',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipes,
+        on_delete=models.CASCADE,
+        related_name='feeds',
+        verbose_name='Рецепт'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+
+    objects = FeedsManager()
+
+    class Meta:
+        ordering = ['-recipe']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='feed_recipe_for_user'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'],
+                name='feed_user_author_idx'
+            )
+        ]
+        verbose_name = 'Рецепт в ленте'
+        verbose_name_plural = 'Ленты подписок'
+
+    def __str__(self) -> str:
+        return f'{self.user} {self.recipe}'
@@ -11,6 +11,11 @@ class User(AbstractUser):
         max_length=254,
         unique=True
     )
+    cart_version = models.PositiveIntegerField(
+        'Версия списка покупок',
+        default=0,
+        editable=False
+    )
 
     class Meta:
         ordering = ('-id',)